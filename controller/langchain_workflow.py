@@ -1,10 +1,199 @@
 import os
+import re
+import asyncio
+import datetime
+import inspect
+import json
 import logging
-from langchain.agents import AgentExecutor, create_tool_calling_agent
-from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain_core.tools import BaseTool, tool
-from typing import List, Dict, Optional, Any, Callable
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from langchain_aws import ChatBedrockConverse
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+from langchain_core.outputs import LLMResult
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder, PromptTemplate
+from langchain_core.tools import BaseTool, StructuredTool, Tool
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from typing import List, Dict, Optional, Any, Callable, Iterator, AsyncIterator, Literal, Tuple
 from services.mcp_langchain_core import MCPLangChainCore
+from utils.async_utils import run_coroutine
+
+
+logger = logging.getLogger(__name__)
+
+# Saída verbose do AgentExecutor em stdout (desligada por padrão; use AgentRunCallback)
+AGENT_VERBOSE = os.getenv('AGENT_VERBOSE', '0') == '1'
+
+# Spans OpenTelemetry por fase do agente (opt-in; exige opentelemetry instalado)
+AGENT_TRACING = os.getenv('AGENT_TRACING', '0') == '1'
+
+# Referência ao resultado de um step anterior dentro do input (ex.: "{step_1_result}")
+STEP_RESULT_REF = re.compile(r"step_\d+_result")
+STEP_RESULT_PLACEHOLDER = re.compile(r"\$?\{step_(\d+)_result\}")
+
+# Palavras de saudação/agradecimento: só mensagens compostas apenas delas
+# dispensam as tools (ver needs_tools); qualquer outra coisa vai para o agente
+SMALL_TALK_WORDS = frozenset((
+    "oi", "olá", "ola", "opa", "e", "aí", "ai", "bom", "boa", "dia", "tarde", "noite",
+    "tudo", "bem", "como", "vai", "você", "voce", "obrigado", "obrigada", "muito",
+    "valeu", "tchau", "até", "ate", "mais", "logo", "ok", "beleza",
+    "hi", "hello", "hey", "good", "morning", "afternoon", "evening", "how", "are",
+    "you", "thanks", "thank", "bye", "goodbye", "see", "later",
+))
+
+
+@dataclass
+class StepResult:
+    """Resultado de um step de workflow (exposto como dict em execute_workflow)."""
+    __slots__ = ('step', 'type', 'input', 'output', 'success')
+    step: int
+    type: str
+    input: str
+    output: Any
+    success: bool
+    
+    def to_dict(self) -> Dict[str, Any]:
+        # Sem dataclasses.asdict, que faria deepcopy dos outputs
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class AgentRunCallback(BaseCallbackHandler):
+    """
+    Callback único das execuções do workflow:
+    - guarda o usage_metadata da última resposta do LLM (inclui tokens lidos do prompt cache);
+    - emite uma linha de log JSON por execução do agente (iterações, tools chamadas e
+      duração), em vez de imprimir cada passo intermediário;
+    - com um tracer (ver create), emite spans OpenTelemetry por fase: agent.respond
+      (execução completa), agent.context (montagem do prompt), agent.decide (chamada
+      ao LLM) e agent.execute (execução de tool).
+    """
+    
+    def __init__(self, tracer: Any = None):
+        self.last_usage: Dict[str, Any] = {}
+        self.tracer = tracer
+        self._runs: Dict[Any, Dict[str, Any]] = {}
+        self._spans: Dict[Any, Any] = {}
+        self._parents: Dict[Any, Any] = {}
+    
+    @classmethod
+    def create(cls) -> "AgentRunCallback":
+        """Cria o callback; spans só com AGENT_TRACING=1 e opentelemetry instalado."""
+        if not AGENT_TRACING:
+            return cls()
+        try:
+            from opentelemetry import trace
+        except ImportError:
+            logger.warning("AGENT_TRACING=1, mas opentelemetry não está instalado")
+            return cls()
+        return cls(trace.get_tracer(__name__))
+    
+    @property
+    def cache_read_input_tokens(self) -> int:
+        """Tokens do prefixo reaproveitados do prompt cache na última chamada."""
+        details = self.last_usage.get("input_token_details") or {}
+        return details.get("cache_read", 0) or 0
+    
+    # -------- spans (no-op sem tracer) --------
+    
+    def _start_span(self, name: str, run_id: Any, parent_run_id: Any, **attributes: Any) -> None:
+        if self.tracer is None:
+            return
+        from opentelemetry import trace
+        
+        # Sobe pela cadeia de runs até o ancestral que tem span (chains internas não têm)
+        parent = parent_run_id
+        while parent is not None and parent not in self._spans:
+            parent = self._parents.get(parent)
+        context = trace.set_span_in_context(self._spans[parent]) if parent is not None else None
+        
+        span = self.tracer.start_span(name, context=context)
+        for key, value in attributes.items():
+            if value is not None:
+                span.set_attribute(key, value)
+        self._spans[run_id] = span
+    
+    def _end_span(self, run_id: Any, error: Optional[BaseException] = None) -> None:
+        self._parents.pop(run_id, None)
+        span = self._spans.pop(run_id, None)
+        if span is None:
+            return
+        if error is not None:
+            span.record_exception(error)
+        span.end()
+    
+    # -------- chains / agente --------
+    
+    def on_chain_start(self, serialized: Optional[Dict[str, Any]], inputs: Any, *, run_id: Any,
+                       parent_run_id: Any = None, **kwargs: Any) -> None:
+        if parent_run_id is None:
+            self._runs[run_id] = {"start": time.perf_counter(), "iterations": 0, "tools_called": []}
+            self._start_span("agent.respond", run_id, None)
+            return
+        if parent_run_id in self._runs:
+            # Cada planejamento do agente é uma chain filha direta do executor
+            self._runs[parent_run_id]["iterations"] += 1
+        if kwargs.get("run_type") == "prompt":
+            self._start_span("agent.context", run_id, parent_run_id)
+        elif self.tracer is not None:
+            self._parents[run_id] = parent_run_id
+    
+    def on_chain_end(self, outputs: Any, *, run_id: Any, **kwargs: Any) -> None:
+        self._end_span(run_id)
+    
+    def on_chain_error(self, error: BaseException, *, run_id: Any, **kwargs: Any) -> None:
+        self._runs.pop(run_id, None)
+        self._end_span(run_id, error)
+    
+    def on_agent_action(self, action: Any, *, run_id: Any, **kwargs: Any) -> None:
+        run = self._runs.get(run_id)
+        if run is not None:
+            run["tools_called"].append(action.tool)
+    
+    def on_agent_finish(self, finish: Any, *, run_id: Any, **kwargs: Any) -> None:
+        run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        logger.info(json.dumps({
+            "event": "agent_finish",
+            "iterations": run["iterations"],
+            "tools_called": run["tools_called"],
+            "duration_ms": round((time.perf_counter() - run["start"]) * 1000, 1),
+        }, ensure_ascii=False))
+    
+    # -------- LLM / tools --------
+    
+    def on_chat_model_start(self, serialized: Optional[Dict[str, Any]], messages: Any, *, run_id: Any,
+                            parent_run_id: Any = None, **kwargs: Any) -> None:
+        if self.tracer is None:
+            return
+        model = ((kwargs.get("invocation_params") or {}).get("model_id")
+                 or (kwargs.get("metadata") or {}).get("ls_model_name"))
+        self._start_span("agent.decide", run_id, parent_run_id, **{"gen_ai.request.model": model})
+    
+    def on_llm_end(self, response: LLMResult, *, run_id: Any, **kwargs: Any) -> None:
+        for generations in response.generations:
+            for generation in generations:
+                message = getattr(generation, "message", None)
+                usage = getattr(message, "usage_metadata", None)
+                if usage:
+                    self.last_usage = dict(usage)
+        self._end_span(run_id)
+    
+    def on_llm_error(self, error: BaseException, *, run_id: Any, **kwargs: Any) -> None:
+        self._end_span(run_id, error)
+    
+    def on_tool_start(self, serialized: Optional[Dict[str, Any]], input_str: str, *, run_id: Any,
+                      parent_run_id: Any = None, **kwargs: Any) -> None:
+        tool_name = (serialized or {}).get("name") or kwargs.get("name")
+        self._start_span("agent.execute", run_id, parent_run_id, **{"gen_ai.tool.name": tool_name})
+    
+    def on_tool_end(self, output: Any, *, run_id: Any, **kwargs: Any) -> None:
+        self._end_span(run_id)
+    
+    def on_tool_error(self, error: BaseException, *, run_id: Any, **kwargs: Any) -> None:
+        self._end_span(run_id, error)
 
 
 class MCPLangChainWorkflow:
@@ -23,10 +212,16 @@ class MCPLangChainWorkflow:
     - Auto-discovery de MCP tools disponíveis
     """
     
+    # Tools descobertas no server, compartilhadas entre instâncias do processo
+    _discovered_tools: Optional[List[BaseTool]] = None
+    
     def __init__(self, model_id: Optional[str] = None, region: str = 'us-east-1', 
                  temperature: float = 0.0, max_tokens: Optional[int] = None, 
                  top_p: Optional[float] = None, load_env: bool = True,
-                 auto_load_mcp: bool = True):
+                 auto_load_mcp: bool = True, max_parallel_requests: int = 10,
+                 cache_backend: Literal["memory", "redis", "none"] = "none",
+                 history_window: Optional[int] = 20, summarize_overflow: bool = True,
+                 latency: Literal["standard", "optimized"] = "standard"):
         """
         Inicializa o controlador de workflow MCP LangChain.
         
@@ -38,27 +233,76 @@ class MCPLangChainWorkflow:
             top_p: Nucleus sampling parameter (0.0-1.0)
             load_env: Carrega variáveis de ambiente automaticamente
             auto_load_mcp: Carrega automaticamente MCP tools do server
+            max_parallel_requests: Máximo de chamadas simultâneas ao Bedrock em steps paralelos
+            cache_backend: Cache de respostas opt-in para modelos determinísticos (temperatura
+                efetiva 0), aplicado só ao modelo deste workflow: "memory" (limitado a
+                LLM_CACHE_SIZE), "redis" (usa REDIS_URL, TTL de 2h) ou "none" (padrão)
+            history_window: Número de mensagens recentes enviadas ao agente (None envia tudo)
+            summarize_overflow: Resume as mensagens que saem da janela em vez de descartá-las
+            latency: "optimized" pede inferência latency-optimized ao Bedrock (modelos suportados)
         """
         # Inicializa o core MCP LangChain
         self.core = MCPLangChainCore(
             model_id=model_id, region=region, temperature=temperature,
-            max_tokens=max_tokens, top_p=top_p, load_env=load_env
+            max_tokens=max_tokens, top_p=top_p, load_env=load_env, latency=latency,
+            cache_backend=cache_backend
         )
         
-        # Lista de tools e agente
-        self.tools: List[BaseTool] = []
+        # Tools indexadas por nome (store canônico) e agente
+        self._tools_by_name: Dict[str, BaseTool] = {}
+        self._tools_version = 0
+        self._tools_list_cache: tuple = (-1, [])
+        self._tools_info_cache: tuple = (-1, [])
+        self._tool_specs: Dict[str, tuple] = {}
         self.mcp_tools: List[BaseTool] = []
+        self._mcp_tools_by_name: Dict[str, BaseTool] = {}
+        self._mcp_tools_version = 0
+        self._mcp_tools_info_cache: tuple = (-1, [])
+        self._mcp_context_cache: tuple = (-1, "")
         self.agent = None
         self.agent_executor = None
         self.agent_template = None
+        self.chat_template = None
+        self._suspend_recreate = False
+        
+        # Cache LRU de (agent, executor) por chave de (llm, tools, template); cada entrada
+        # guarda referências aos objetos da chave (ver _agent_cache_key)
+        self._agent_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._agent_cache_size = 4
         
-        # Logger
-        self.logger = logging.getLogger(__name__)
+        # Pares (template do agente, template sem tools) por (system_prompt, cache_system, MCP tools, llm)
+        self._template_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+        
+        # Limite de concorrência para steps paralelos do workflow
+        self.max_parallel_requests = max_parallel_requests
+        
+        # Usage (prompt caching), log por execução e spans opcionais em um único callback
+        self.run_callback = AgentRunCallback.create()
+        self._run_callbacks: List[BaseCallbackHandler] = [self.run_callback]
+        
+        # Índice da mensagem do histórico que recebeu o breakpoint de cache no último turno
+        self._last_cache_anchor_idx: Optional[int] = None
+        
+        # Janela de histórico + resumo acumulado das mensagens mais antigas
+        self.history_window = history_window
+        self.summarize_overflow = summarize_overflow
+        self._history_summary: Optional[str] = None
+        self._summarized_count = 0
         
         # Auto-carrega MCP tools se solicitado
         if auto_load_mcp:
             self._auto_load_mcp_tools()
     
+    @classmethod
+    def clear_core_cache(cls):
+        """Descarta os clientes Bedrock compartilhados entre workflows. Útil em testes."""
+        MCPLangChainCore.clear_model_cache()
+    
+    @classmethod
+    def clear_discovery_cache(cls):
+        """Descarta as tools descobertas, forçando um novo discovery na próxima instância."""
+        cls._discovered_tools = None
+    
     @property
     def model_id(self):
         """Retorna o model_id do core."""
@@ -69,6 +313,20 @@ class MCPLangChainWorkflow:
         """Retorna o modelo LLM do core."""
         return self.core.llm
     
+    @property
+    def tools(self) -> List[BaseTool]:
+        """
+        Retorna as tools registradas, ordenadas por nome.
+        A ordem estável mantém o bloco de tools enviado ao modelo idêntico entre
+        execuções (pré-requisito para prompt caching). A lista é reaproveitada
+        até a próxima adição/remoção.
+        """
+        version, tools_list = self._tools_list_cache
+        if version != self._tools_version:
+            tools_list = [tool for _, tool in sorted(self._tools_by_name.items())]
+            self._tools_list_cache = (self._tools_version, tools_list)
+        return tools_list
+    
     # ===============================
     # MCP TOOLS MANAGEMENT - Automatic discovery and loading
     # ===============================
@@ -78,57 +336,94 @@ class MCPLangChainWorkflow:
         try:
             mcp_tools = self._discover_mcp_tools()
             loaded_count = 0
-            for tool in mcp_tools:
-                if self.register_mcp_tool(tool):
-                    loaded_count += 1
-            self.logger.info(f"Auto-carregadas {loaded_count} MCP tools")
+            with self._batch_tool_changes():
+                for tool in mcp_tools:
+                    if self.register_mcp_tool(tool):
+                        loaded_count += 1
+            logger.info("Auto-carregadas %s MCP tools", loaded_count)
             return loaded_count
         except Exception as e:
-            self.logger.warning(f"Erro ao auto-carregar MCP tools: {e}")
+            logger.warning("Erro ao auto-carregar MCP tools: %s", e)
             return 0
     
     def _discover_mcp_tools(self) -> List[BaseTool]:
         """
         Descobre MCP tools disponíveis no server usando módulo de discovery otimizado.
+        O discovery roda uma vez por processo: novas instâncias (ex.: workflows por
+        thread) reaproveitam as mesmas tools.
         
         Returns:
             List[BaseTool]: Lista de tools descobertas (MCP + fallback se necessário)
         """
         try:
-            import sys
-            import os
-            sys.path.append(os.path.dirname(os.path.dirname(__file__)))
-            from mcp_files.core.tool_wrappers import get_tool_discovery
-            
-            # Usa o sistema de discovery otimizado
-            discovery = get_tool_discovery()
-            tools = discovery.discover_all_tools()
-            
-            if tools:
-                self.logger.info(f"Sistema de discovery carregou {len(tools)} tools com sucesso")
-            else:
-                self.logger.warning("Nenhuma tool foi descoberta pelo sistema")
-            
-            return tools
-            
+            return self._shared_discovery()
         except Exception as e:
-            self.logger.error(f"Erro no sistema de discovery: {e}")
+            logger.error("Erro no sistema de discovery: %s", e)
             return self._fallback_manual_discovery()
     
+    @classmethod
+    def _shared_discovery(cls) -> List[BaseTool]:
+        """Executa o discovery (ou devolve o já feito) e compartilha o resultado entre instâncias."""
+        cached = cls._discovered_tools
+        if cached is not None:
+            return list(cached)
+        
+        from mcp_files.core.tool_wrappers import get_tool_discovery
+        
+        # Usa o sistema de discovery otimizado
+        discovery = get_tool_discovery()
+        tools = discovery.discover_all_tools()
+        
+        if tools:
+            logger.info("Sistema de discovery carregou %s tools com sucesso", len(tools))
+            cls._discovered_tools = list(tools)
+        else:
+            logger.warning("Nenhuma tool foi descoberta pelo sistema")
+        
+        return tools
+    
+    @classmethod
+    def prefetch_mcp_tools(cls) -> int:
+        """
+        Antecipa o discovery sem criar um workflow (ex.: em paralelo com a criação
+        do cliente Bedrock no cold start). Retorna o número de tools descobertas.
+        """
+        try:
+            return len(cls._shared_discovery())
+        except Exception as e:
+            logger.warning("Erro ao antecipar o discovery de MCP tools: %s", e)
+            return 0
+    
     def register_mcp_tool(self, tool: BaseTool) -> bool:
         """Registra uma MCP tool específica."""
         try:
-            if tool not in self.mcp_tools:
-                self.mcp_tools.append(tool)
-                return self.add_tool(tool)
-            return False
+            if tool.name in self._mcp_tools_by_name:
+                return False
+            self._mcp_tools_by_name[tool.name] = tool
+            self.mcp_tools.append(tool)
+            self._mcp_tools_version += 1
+            return self.add_tool(tool)
         except Exception as e:
-            self.logger.error(f"Erro ao registrar MCP tool: {e}")
+            logger.error("Erro ao registrar MCP tool: %s", e)
             return False
     
     def get_mcp_tools_info(self) -> List[Dict[str, str]]:
         """Retorna informações específicas sobre MCP tools carregadas."""
-        return [{"name": tool.name, "description": tool.description, "type": "MCP Tool", "source": "MCP Server"} for tool in self.mcp_tools]
+        version, tools_info = self._mcp_tools_info_cache
+        if version != self._mcp_tools_version:
+            tools_info = [{"name": tool.name, "description": tool.description, "type": "MCP Tool", "source": "MCP Server"} for tool in self.mcp_tools]
+            self._mcp_tools_info_cache = (self._mcp_tools_version, tools_info)
+        return list(tools_info)
+    
+    def _mcp_context(self) -> str:
+        """Bloco de texto com as MCP tools para o system prompt, recalculado só quando elas mudam."""
+        version, context = self._mcp_context_cache
+        if version != self._mcp_tools_version:
+            context = ""
+            if self.mcp_tools:
+                context = "\n\nMCP Tools disponíveis:\n" + "\n".join(f"- {tool.name}: {tool.description}" for tool in self.mcp_tools)
+            self._mcp_context_cache = (self._mcp_tools_version, context)
+        return context
     
     # ===============================
     # GERENCIAMENTO DE TOOLS - Criação, adição e remoção de ferramentas
@@ -139,11 +434,30 @@ class MCPLangChainWorkflow:
         Cria uma tool customizada a partir de uma função Python.
         Permite transformar qualquer função em uma ferramenta que o agente pode usar.
         Complementa as MCP tools com funcionalidades específicas do domínio.
+        
+        Funções de um único argumento texto (ou sem anotações) viram uma Tool simples,
+        chamada diretamente sem validação Pydantic; funções com assinatura tipada viram
+        uma StructuredTool com o schema inferido da própria assinatura.
         """
-        @tool(name=name, description=description)
-        def custom_tool(input_text: str) -> str:
-            return func(input_text)
-        return custom_tool
+        annotations = {k: v for k, v in getattr(func, "__annotations__", {}).items() if k != "return"}
+        try:
+            params = list(inspect.signature(func).parameters.values())
+        except (TypeError, ValueError):
+            params = []
+        
+        if len(params) == 1 and annotations.get(params[0].name, str) is str:
+            return Tool(name=name, description=description, func=func)
+        return StructuredTool.from_function(func=func, name=name, description=description)
+    
+    def register_memory_tool(self, search_fn: Callable[[str], str], name: str = "recall_memory",
+                             description: str = "Recupera fatos e preferências do usuário de conversas anteriores a partir de uma consulta") -> bool:
+        """
+        Expõe uma camada de memória (ex.: mem0) como tool do agente.
+        O agente consulta a memória sob demanda, então o system prompt continua
+        idêntico entre turnos e o prefixo permanece no prompt cache.
+        """
+        memory_tool = self.create_custom_tool(name, description, search_fn)
+        return self.add_tool(memory_tool)
     
     def add_tool(self, tool: BaseTool) -> bool:
         """
@@ -152,121 +466,438 @@ class MCPLangChainWorkflow:
         Funciona tanto para MCP tools quanto tools customizadas.
         """
         try:
-            if tool not in self.tools:
-                self.tools.append(tool)
-                if self.agent is not None:
+            if tool.name not in self._tools_by_name:
+                self._tools_by_name[tool.name] = tool
+                self._tools_version += 1
+                if self.agent is not None and not self._suspend_recreate:
                     self._recreate_agent()
                 return True
             else:
-                self.logger.warning(f"Tool {tool.name} já existe")
+                logger.warning("Tool %s já existe", tool.name)
                 return False
         except Exception as e:
-            self.logger.error(f"Erro ao adicionar tool: {e}")
+            logger.error("Erro ao adicionar tool: %s", e)
             return False
     
     def add_tools(self, tools: List[BaseTool]) -> int:
         """
         Adiciona múltiplas tools de uma vez.
         Mais eficiente que adicionar uma por uma. Funciona com mix de MCP e custom tools.
+        O agente é recriado uma única vez ao final, e não a cada tool adicionada.
         """
         added_count = 0
-        for tool in tools:
-            if self.add_tool(tool):
-                added_count += 1
+        with self._batch_tool_changes():
+            for tool in tools:
+                if self.add_tool(tool):
+                    added_count += 1
         return added_count
     
+    @contextmanager
+    def _batch_tool_changes(self):
+        """
+        Agrupa várias alterações de tools: add_tool não recria o agente dentro do
+        bloco, e o agente é recriado uma única vez ao final se algo mudou.
+        """
+        if self._suspend_recreate:
+            yield
+            return
+        
+        version = self._tools_version
+        self._suspend_recreate = True
+        try:
+            yield
+        finally:
+            self._suspend_recreate = False
+        
+        if self._tools_version != version and self.agent is not None:
+            self._recreate_agent()
+    
     def remove_tool(self, tool_name: str) -> bool:
-        """Remove uma tool da lista (MCP ou customizada)."""
+        """Remove uma tool da lista (MCP ou customizada). Retorna False se a tool não existir."""
         try:
-            # Remove da lista geral
-            for i, tool in enumerate(self.tools):
-                if tool.name == tool_name:
-                    self.tools.pop(i)
-                    break
+            # Remove do índice geral
+            if self._tools_by_name.pop(tool_name, None) is None:
+                return False
+            self._tools_version += 1
+            self._tool_specs.pop(tool_name, None)
             
             # Remove da lista MCP se aplicável
-            for i, tool in enumerate(self.mcp_tools):
-                if tool.name == tool_name:
-                    self.mcp_tools.pop(i)
-                    break
+            if self._mcp_tools_by_name.pop(tool_name, None) is not None:
+                self._mcp_tools_version += 1
+                self.mcp_tools[:] = [tool for tool in self.mcp_tools if tool.name != tool_name]
             
             if self.agent is not None:
                 self._recreate_agent()
             return True
             
         except Exception as e:
-            self.logger.error(f"Erro ao remover tool: {e}")
+            logger.error("Erro ao remover tool: %s", e)
             return False
     
+    def iter_available_tools(self) -> Iterator[Dict[str, str]]:
+        """Percorre as informações das tools disponíveis sem montar uma lista nova."""
+        return iter(self._tools_descriptors())
+    
     def get_available_tools(self) -> List[Dict[str, str]]:
         """Retorna informações sobre todas as tools disponíveis (MCP + customizadas)."""
-        return [{"name": tool.name, "description": tool.description, "type": type(tool).__name__} for tool in self.tools]
+        return list(self._tools_descriptors())
+    
+    def _tools_descriptors(self) -> List[Dict[str, str]]:
+        """Descritores das tools, recalculados apenas após adição/remoção."""
+        version, descriptors = self._tools_info_cache
+        if version != self._tools_version:
+            descriptors = [{"name": tool.name, "description": tool.description, "type": type(tool).__name__} for tool in self._tools_by_name.values()]
+            self._tools_info_cache = (self._tools_version, descriptors)
+        return descriptors
     
     # ===============================
     # CRIAÇÃO E EXECUÇÃO DE AGENTES - Core da funcionalidade de IA com MCP
     # ===============================
     
-    def create_agent_template(self, system_prompt: str) -> ChatPromptTemplate:
+    def create_agent_template(self, system_prompt: str, cache_system: bool = True) -> ChatPromptTemplate:
         """
         Cria template de prompt otimizado para agentes com MCP tools.
         Template inclui instruções específicas para uso eficiente de MCP tools.
+        
+        Com cache_system=True o system prompt e o bloco de MCP tools são marcados
+        para prompt caching do Bedrock, reaproveitando o prefixo estático entre
+        chamadas de invoke_agent. Conteúdo dinâmico deve vir depois do histórico.
+        Modelos sem suporte a marcadores (ver _supports_cache_markers) recebem o
+        system prompt como texto simples.
+        
+        Também monta chat_template, o mesmo prompt sem o contexto de MCP tools,
+        usado por invoke_without_tools.
+        
+        Não concatene conteúdo dinâmico (memórias recuperadas, timestamps, IDs) ao
+        system_prompt: isso invalida o cache a cada turno. Para memórias, use
+        register_memory_tool.
         """
-        # Adiciona contexto sobre MCP tools disponíveis ao prompt
-        mcp_context = ""
-        if self.mcp_tools:
-            mcp_tools_list = [f"- {tool.name}: {tool.description}" for tool in self.mcp_tools]
-            mcp_context = f"\n\nMCP Tools disponíveis:\n" + "\n".join(mcp_tools_list)
+        # Reaproveita o mesmo objeto de template para a mesma configuração, o que
+        # também mantém válida a chave dos agentes já cacheados para ele
+        template_key = (system_prompt, cache_system, id(self.llm), self._mcp_tools_version)
+        cached = self._template_cache.get(template_key)
+        if cached is not None:
+            self._template_cache.move_to_end(template_key)
+            self.agent_template, self.chat_template = cached
+            return self.agent_template
         
-        enhanced_prompt = system_prompt + mcp_context
+        # Adiciona contexto sobre MCP tools disponíveis ao prompt
+        mcp_context = self._mcp_context()
         
         self.agent_template = ChatPromptTemplate.from_messages([
-            ("system", enhanced_prompt),
+            self._system_message(system_prompt, mcp_context, cache_system),
             MessagesPlaceholder(variable_name="chat_history"),
             ("human", "{input}"),
             MessagesPlaceholder(variable_name="agent_scratchpad"),
         ])
+        # Sem tools vinculadas, o modelo não deve ser informado sobre elas
+        self.chat_template = ChatPromptTemplate.from_messages([
+            self._system_message(system_prompt, "", cache_system),
+            MessagesPlaceholder(variable_name="chat_history"),
+            ("human", "{input}"),
+        ])
+        
+        self._template_cache[template_key] = (self.agent_template, self.chat_template)
+        if len(self._template_cache) > self._agent_cache_size:
+            self._template_cache.popitem(last=False)
         return self.agent_template
     
+    def _system_message(self, system_prompt: str, tools_context: str, cache_system: bool):
+        """Mensagem de sistema do template, com marcação de prompt caching quando suportada."""
+        if cache_system and self._supports_cache_markers:
+            return self._build_cached_system_message(system_prompt, tools_context)
+        return ("system", system_prompt + tools_context)
+    
+    def _build_cached_system_message(self, system_prompt: str, tools_context: str) -> SystemMessage:
+        """
+        Monta a mensagem de sistema em blocos com marcação de prompt caching.
+        ChatBedrock (Anthropic) usa cache_control por bloco; ChatBedrockConverse usa cachePoint.
+        """
+        # O system prompt segue a sintaxe de template ({{ }}), então é renderizado uma única vez
+        rendered_prompt = PromptTemplate.from_template(system_prompt).format()
+        blocks = [{"type": "text", "text": text} for text in (rendered_prompt, tools_context) if text]
+        return SystemMessage(content=self._add_cache_marker(blocks))
+    
+    @property
+    def _supports_cache_markers(self) -> bool:
+        """
+        Indica se o modelo aceita conteúdo em blocos com marcador de prompt caching.
+        ChatBedrockConverse usa cachePoint; no ChatBedrock só o provider anthropic
+        aceita blocos: para meta/mistral/cohere o conteúdo vira texto do prompt.
+        """
+        if isinstance(self.llm, ChatBedrockConverse):
+            return True
+        return 'anthropic' in self.model_id.lower()
+    
+    def _add_cache_marker(self, blocks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Adiciona o marcador de prompt caching no formato esperado pelo modelo configurado."""
+        if isinstance(self.llm, ChatBedrockConverse):
+            blocks.append({"cachePoint": {"type": "default"}})
+        else:
+            for block in blocks:
+                block["cache_control"] = {"type": "ephemeral"}
+        return blocks
+    
+    def _history_with_cache_anchor(self) -> List[BaseMessage]:
+        """
+        Retorna o histórico com breakpoint de cache na última resposta do agente.
+        Só a cópia enviada ao modelo recebe o marcador: o histórico armazenado
+        permanece append-only, então o prefixo dos turnos anteriores é reaproveitado
+        e apenas a nova mensagem do usuário precisa de prefill.
+        """
+        messages = self._windowed_history()
+        self._last_cache_anchor_idx = None
+        if not self._supports_cache_markers:
+            return messages
+        
+        for idx in range(len(messages) - 1, -1, -1):
+            message = messages[idx]
+            if isinstance(message, AIMessage) and isinstance(message.content, str) and message.content:
+                blocks = self._add_cache_marker([{"type": "text", "text": message.content}])
+                messages[idx] = AIMessage(content=blocks)
+                self._last_cache_anchor_idx = idx
+                break
+        
+        return messages
+    
+    def _windowed_history(self) -> List[BaseMessage]:
+        """
+        Limita o histórico enviado ao agente à janela configurada, sem chamar o modelo.
+        Com summarize_overflow, as mensagens já resumidas são substituídas por um par
+        usuário/assistente com o resumo; chat_history não recebe um segundo SystemMessage.
+        O resumo é atualizado antes, por _refresh_history_summary/_arefresh_history_summary.
+        Um resumo restaurado de sessão pode cobrir mensagens que já não estão no
+        histórico (summarized_count 0), então ele é enviado mesmo dentro da janela.
+        """
+        messages = self.core.chat_history.messages
+        window = self.history_window
+        # Uma única cópia por chamada (fatias já são listas novas): o anchor de cache
+        # altera a lista retornada, nunca o histórico armazenado
+        if self.summarize_overflow and self._history_summary:
+            recent = messages[self._summarized_count:]
+            recent[:0] = [
+                HumanMessage(content=f"Resumo da conversa anterior: {self._history_summary}"),
+                AIMessage(content="Entendido, vou considerar esse contexto."),
+            ]
+            return recent
+        
+        if not window or len(messages) <= window or self.summarize_overflow:
+            return list(messages)
+        return messages[self._turn_start(messages, len(messages) - window, 0):]
+    
+    @staticmethod
+    def _turn_start(messages: List[BaseMessage], idx: int, floor: int) -> int:
+        """
+        Ajusta um corte do histórico para o início de um turno (HumanMessage), para
+        não deixar uma resposta ou resultado de tool órfão no começo da janela.
+        Procura a próxima mensagem do usuário; se não houver, a anterior (acima de floor).
+        """
+        for pos in range(idx, len(messages)):
+            if isinstance(messages[pos], HumanMessage):
+                return pos
+        for pos in range(idx - 1, floor, -1):
+            if isinstance(messages[pos], HumanMessage):
+                return pos
+        return idx
+    
+    def _pending_overflow(self) -> Optional[Tuple[int, List[BaseMessage]]]:
+        """
+        Mensagens que devem entrar no resumo e o novo ponto de corte, ou None.
+        O resumo só avança quando o buffer passa de 2x a janela, então entre
+        atualizações o prefixo enviado permanece estável.
+        """
+        messages = self.core.chat_history.messages
+        window = self.history_window
+        if not (window and self.summarize_overflow) or len(messages) - self._summarized_count <= 2 * window:
+            return None
+        cut = self._turn_start(messages, len(messages) - window, self._summarized_count)
+        if cut <= self._summarized_count:
+            return None
+        return cut, messages[self._summarized_count:cut]
+    
+    def _summary_prompt(self, overflow: List[BaseMessage]) -> str:
+        """Prompt que incorpora as mensagens que saíram da janela ao resumo acumulado."""
+        transcript = "\n".join(f"{message.type}: {message.content}" for message in overflow)
+        previous = f"Resumo atual: {self._history_summary}\n\n" if self._history_summary else ""
+        return (
+            "Resuma de forma concisa a conversa abaixo, preservando fatos, preferências "
+            f"e decisões do usuário.\n\n{previous}Novas mensagens:\n{transcript}"
+        )
+    
+    def _refresh_history_summary(self):
+        """Atualiza o resumo das mensagens fora da janela, se necessário."""
+        pending = self._pending_overflow()
+        if pending is not None:
+            cut, overflow = pending
+            self._history_summary = self.core.invoke_simple(self._summary_prompt(overflow))
+            self._summarized_count = cut
+    
+    async def _arefresh_history_summary(self):
+        """Versão assíncrona de _refresh_history_summary (não bloqueia o event loop)."""
+        pending = self._pending_overflow()
+        if pending is not None:
+            cut, overflow = pending
+            self._history_summary = await self.core.ainvoke_simple(self._summary_prompt(overflow))
+            self._summarized_count = cut
+    
+    def _agent_history(self, include_history: bool) -> List[BaseMessage]:
+        """Histórico a enviar ao agente (vazio sem include_history), com o resumo em dia."""
+        if not include_history:
+            return []
+        self._refresh_history_summary()
+        return self._history_with_cache_anchor()
+    
+    async def _aagent_history(self, include_history: bool) -> List[BaseMessage]:
+        """Versão assíncrona de _agent_history."""
+        if not include_history:
+            return []
+        await self._arefresh_history_summary()
+        return self._history_with_cache_anchor()
+    
+    def _reset_history_summary(self):
+        """Descarta o resumo acumulado. Usado quando o histórico é trocado ou limpo."""
+        self._history_summary = None
+        self._summarized_count = 0
+    
+    def reset_cache_anchor(self):
+        """Descarta o breakpoint de cache do histórico. Usado quando o histórico é trocado ou limpo."""
+        self._last_cache_anchor_idx = None
+    
     def create_agent(self, template: Optional[ChatPromptTemplate] = None) -> bool:
         """
         Cria o agente com as tools configuradas (MCP + customizadas).
         Otimizado para execução eficiente de MCP tools.
         """
         try:
-            if not self.tools:
+            if not self._tools_by_name:
                 raise ValueError("Nenhuma tool foi adicionada")
             
             current_template = template or self.agent_template
             if current_template is None:
                 raise ValueError("Template de agente não foi definido")
             
-            # Cria o agente
+            # Reaproveita o agente se (llm, tools, template) não mudaram
+            cache_key, key_refs = self._agent_cache_key(current_template)
+            cached = self._agent_cache.get(cache_key)
+            if cached is not None:
+                self._agent_cache.move_to_end(cache_key)
+                _, self.agent, self.agent_executor = cached
+                return True
+            
+            # langchain.agents é pesado de importar: carregado só ao criar o primeiro agente
+            from langchain.agents import AgentExecutor, create_tool_calling_agent
+            
+            # Cria o agente. bind_tools aceita schemas já convertidos: cada tool é
+            # serializada uma vez (ver _tool_spec), inclusive ao recriar o agente
+            # após adicionar/remover tools, caso que o cache de agentes não cobre
             self.agent = create_tool_calling_agent(
                 llm=self.llm,
-                tools=self.tools,
+                tools=[self._tool_spec(tool) for tool in self.tools],
                 prompt=current_template
             )
             
-            # Cria o executor com configurações otimizadas para MCP
+            # Cria o executor com configurações otimizadas para MCP. Com cache de
+            # respostas o agente chama o modelo via invoke (stream_runnable=False):
+            # o LangChain não consulta o cache no caminho de streaming
             self.agent_executor = AgentExecutor(
                 agent=self.agent,
                 tools=self.tools,
-                verbose=True,
+                verbose=AGENT_VERBOSE,
                 handle_parsing_errors=True,
                 max_iterations=10,  # Permite múltiplas chamadas MCP
-                early_stopping_method="generate"
+                early_stopping_method="generate",
+                stream_runnable=not self.core.has_response_cache
             )
             
+            self._agent_cache[cache_key] = (key_refs, self.agent, self.agent_executor)
+            if len(self._agent_cache) > self._agent_cache_size:
+                self._agent_cache.popitem(last=False)
+            
             return True
         except Exception as e:
-            self.logger.error(f"Erro ao criar agente: {e}")
+            logger.error("Erro ao criar agente: %s", e)
             return False
     
+    def _tool_spec(self, tool: BaseTool) -> Dict[str, Any]:
+        """
+        Schema da tool no formato aceito por bind_tools, serializado uma vez por tool.
+        Ao recriar o agente após adicionar/remover uma tool, só a tool nova é convertida.
+        Para ChatBedrockConverse o schema já vai no formato toolSpec, que bind_tools
+        repassa sem modificar.
+        """
+        converse = isinstance(self.llm, ChatBedrockConverse)
+        cached = self._tool_specs.get(tool.name)
+        if cached is not None and cached[0] is tool and cached[1] == converse:
+            return cached[2]
+        
+        spec = convert_to_openai_tool(tool)
+        if converse:
+            function = dict(spec["function"])
+            function["description"] = function.get("description") or function["name"]
+            function["inputSchema"] = {"json": function.pop("parameters")}
+            spec = {"toolSpec": function}
+        self._tool_specs[tool.name] = (tool, converse, spec)
+        return spec
+    
+    def _agent_cache_key(self, template: ChatPromptTemplate) -> Tuple[tuple, tuple]:
+        """
+        Chave da configuração do agente e os objetos que ela identifica.
+        Tools entram por nome, descrição e identidade, então trocar a implementação
+        ou a descrição de uma tool invalida o cache. A chave é a própria tupla (sem
+        hash() intermediário, que poderia colidir); llm, tools e template não são
+        hasheáveis, então entram por id() e a entrada do cache guarda as referências
+        (key_refs): enquanto ela existir, esses id() não podem ser reutilizados.
+        """
+        tools = sorted(self._tools_by_name.items())
+        cache_key = (
+            id(self.llm),
+            tuple((name, tool.description, id(tool)) for name, tool in tools),
+            id(template),
+        )
+        key_refs = (self.llm, tuple(tool for _, tool in tools), template)
+        return cache_key, key_refs
+    
     def _recreate_agent(self):
         """Recria o agente com as tools atualizadas."""
         if self.agent_template is not None:
             self.create_agent()
     
+    def needs_tools(self, user_input: str) -> bool:
+        """
+        Roteamento barato: indica se a pergunta deve passar pelo agente.
+        Só mensagens formadas apenas por saudações/agradecimentos (SMALL_TALK_WORDS)
+        vão para invoke_without_tools; na dúvida, a pergunta usa as tools.
+        """
+        words = re.findall(r"\w+", user_input.lower())
+        return not words or not SMALL_TALK_WORDS.issuperset(words)
+    
+    def invoke_without_tools(self, user_input: str, include_history: bool = True) -> str:
+        """
+        Responde com o system prompt do agente, mas sem AgentExecutor, schemas nem
+        contexto de tools (chat_template). Evita os tokens do bloco de tools e o loop
+        do agente em perguntas que não precisam deles.
+        """
+        try:
+            if self.chat_template is None:
+                raise ValueError("Template de agente não foi definido")
+            
+            messages = self.chat_template.format_messages(
+                input=user_input,
+                chat_history=self._agent_history(include_history)
+            )
+            result = self.llm.invoke(messages, config={"callbacks": self._run_callbacks})
+            output = self._chunk_text(result.content)
+            
+            # Adiciona ao histórico se solicitado
+            if include_history:
+                self.core.chat_history.add_user_message(user_input)
+                self.core.chat_history.add_ai_message(output)
+            
+            return output
+        except Exception as e:
+            logger.error("Erro na inferência sem tools: %s", e)
+            raise
+    
     def invoke_agent(self, user_input: str, include_history: bool = True) -> str:
         """
         Executa o agente com a entrada do usuário.
@@ -279,11 +910,11 @@ class MCPLangChainWorkflow:
             # Prepara input para o agente
             agent_input = {
                 "input": user_input,
-                "chat_history": self.core.chat_history.messages if include_history else []
+                "chat_history": self._agent_history(include_history)
             }
             
             # Executa o agente
-            result = self.agent_executor.invoke(agent_input)
+            result = self.agent_executor.invoke(agent_input, config={"callbacks": self._run_callbacks})
             
             # Adiciona ao histórico se solicitado
             if include_history:
@@ -292,8 +923,90 @@ class MCPLangChainWorkflow:
             
             return result["output"]
         except Exception as e:
-            self.logger.error(f"Erro na execução do agente: {e}")
+            logger.error("Erro na execução do agente: %s", e)
+            raise
+    
+    async def ainvoke_agent(self, user_input: str, include_history: bool = True) -> str:
+        """
+        Versão assíncrona de invoke_agent.
+        Permite sobrepor várias chamadas ao agente (ex.: steps paralelos de workflow).
+        """
+        try:
+            if self.agent_executor is None:
+                raise ValueError("Agente não foi criado")
+            
+            # Prepara input para o agente
+            agent_input = {
+                "input": user_input,
+                "chat_history": await self._aagent_history(include_history)
+            }
+            
+            # Executa o agente
+            result = await self.agent_executor.ainvoke(agent_input, config={"callbacks": self._run_callbacks})
+            
+            # Adiciona ao histórico se solicitado
+            if include_history:
+                self.core.chat_history.add_user_message(user_input)
+                self.core.chat_history.add_ai_message(result["output"])
+            
+            return result["output"]
+        except Exception as e:
+            logger.error("Erro na execução assíncrona do agente: %s", e)
+            raise
+    
+    async def stream_agent(self, user_input: str, include_history: bool = True) -> AsyncIterator[str]:
+        """
+        Executa o agente emitindo os tokens da resposta conforme são gerados.
+        Reduz a latência percebida (tempo até o primeiro token) sem alterar o tempo total.
+        """
+        if self.agent_executor is None:
+            raise ValueError("Agente não foi criado")
+        
+        # Prepara input para o agente
+        agent_input = {
+            "input": user_input,
+            "chat_history": await self._aagent_history(include_history)
+        }
+        
+        buffer: List[str] = []
+        final_output: Optional[str] = None
+        try:
+            async for event in self.agent_executor.astream_events(
+                agent_input, version="v2", config={"callbacks": self._run_callbacks}
+            ):
+                if event["event"] == "on_chat_model_stream":
+                    text = self._chunk_text(event["data"]["chunk"].content)
+                    if text:
+                        buffer.append(text)
+                        yield text
+                elif event["event"] == "on_chain_end" and event["name"] == "AgentExecutor":
+                    output = event["data"].get("output") or {}
+                    final_output = output.get("output") if isinstance(output, dict) else None
+        except Exception as e:
+            logger.error("Erro no streaming do agente: %s", e)
             raise
+        
+        # Resposta vinda do cache de respostas não gera tokens: emite a saída final de uma vez
+        if not buffer and final_output:
+            yield final_output
+        
+        # Adiciona ao histórico se solicitado (resposta final, sem os passos intermediários)
+        if include_history:
+            self.core.chat_history.add_user_message(user_input)
+            self.core.chat_history.add_ai_message(final_output if final_output is not None else "".join(buffer))
+    
+    @staticmethod
+    def _chunk_text(content: Any) -> str:
+        """Extrai o texto de um chunk de streaming (string ou lista de blocos)."""
+        if isinstance(content, str):
+            return content
+        if isinstance(content, list):
+            return "".join(
+                block.get("text", "") if isinstance(block, dict) else str(block)
+                for block in content
+                if not isinstance(block, dict) or block.get("type", "text") == "text"
+            )
+        return ""
     
     # ===============================
     # WORKFLOWS MULTI-STEP - Orquestração com MCP tools
@@ -303,58 +1016,195 @@ class MCPLangChainWorkflow:
         """
         Executa um workflow de múltiplas etapas com MCP tools.
         Suporta tipos de step: 'agent' (com MCP tools), 'simple', 'template', 'mcp_direct'.
+        O input pode referenciar resultados anteriores com "{step_N_result}".
+        
+        Se algum step declarar 'depends_on' (lista de números de step), o workflow é
+        executado como DAG: cada frontier de steps prontos roda em paralelo.
+        Caso contrário, steps consecutivos com o mesmo 'parallel_group' rodam em
+        paralelo e steps 'simple' independentes são enviados juntos via llm.batch.
+        A concorrência é limitada por max_parallel_requests. Steps de agente que rodam
+        em paralelo não usam o histórico da conversa (include_history é ignorado).
         """
         workflow_context = context or {}
-        results = []
+        results: List[StepResult] = []
         
         try:
-            for i, step in enumerate(steps):
-                step_type = step.get('type', 'agent')
-                step_input = step.get('input', '')
-                step_config = step.get('config', {})
-                
-                if step_type == 'agent':
-                    result = self.invoke_agent(step_input, step_config.get('include_history', True))
-                elif step_type == 'simple':
-                    result = self.core.invoke_simple(step_input)
-                elif step_type == 'template':
-                    template = step_config.get('template')
-                    if template:
-                        result = self.core.invoke_with_template(template, **step_config.get('params', {}))
-                    else:
-                        raise ValueError(f"Template não fornecido para step {i+1}")
-                elif step_type == 'mcp_direct':
-                    # Execução direta de MCP tool específica
-                    tool_name = step_config.get('tool_name')
-                    result = self._execute_mcp_tool_direct(tool_name, step_input)
-                else:
-                    raise ValueError(f"Tipo de step desconhecido: {step_type}")
-                
-                results.append({
-                    'step': i+1, 'type': step_type, 'input': step_input,
-                    'output': result, 'success': True
-                })
-                workflow_context[f'step_{i+1}_result'] = result
+            if any('depends_on' in step for step in steps):
+                run_coroutine(self._execute_dag(steps, workflow_context, results))
+            else:
+                self._execute_linear(steps, workflow_context, results)
             
             return {
-                'success': True, 'results': results, 
+                'success': True, 'results': [result.to_dict() for result in results], 
                 'context': workflow_context, 'total_steps': len(steps),
                 'mcp_tools_used': len(self.mcp_tools)
             }
             
         except Exception as e:
-            self.logger.error(f"Erro no workflow: {e}")
+            logger.error("Erro no workflow: %s", e)
             return {
-                'success': False, 'error': str(e), 'results': results,
+                'success': False, 'error': str(e), 'results': [result.to_dict() for result in results],
                 'context': workflow_context, 'failed_step': len(results) + 1
             }
     
+    def _execute_linear(self, steps: List[Dict[str, Any]], workflow_context: Dict, results: List[StepResult]):
+        """Executa os steps em ordem, agrupando blocos paralelos e batches."""
+        for mode, group in self._group_steps(steps):
+            group = [(i, self._resolve_step_input(step, workflow_context)) for i, step in group]
+            
+            if mode == 'batch':
+                outputs = self.core.invoke_batch(
+                    [step.get('input', '') for _, step in group], self.max_parallel_requests
+                )
+            elif mode == 'parallel':
+                outputs = run_coroutine(self._execute_parallel_group(group))
+            else:
+                i, step = group[0]
+                outputs = [self._execute_step(i, step)]
+            
+            for (i, step), result in zip(group, outputs):
+                self._record_step_result(i, step, result, workflow_context, results)
+    
+    async def _execute_dag(self, steps: List[Dict[str, Any]], workflow_context: Dict, results: List[StepResult]):
+        """
+        Executa os steps como DAG (estilo LLMCompiler): a cada rodada, todos os steps
+        cujas dependências já terminaram são disparados juntos. Só um step sozinho
+        na rodada usa o histórico da conversa (ver _aexecute_step).
+        """
+        dependencies = {i: self._step_dependencies(i, step, len(steps)) for i, step in enumerate(steps)}
+        semaphore = asyncio.Semaphore(self.max_parallel_requests)
+        done: set = set()
+        
+        while len(done) < len(steps):
+            frontier = [i for i in range(len(steps)) if i not in done and dependencies[i] <= done]
+            if not frontier:
+                raise ValueError("Dependência circular entre steps do workflow")
+            
+            ready = [(i, self._resolve_step_input(steps[i], workflow_context)) for i in frontier]
+            shared_history = len(ready) == 1
+            outputs = await asyncio.gather(
+                *[self._aexecute_step(i, step, semaphore, shared_history) for i, step in ready]
+            )
+            
+            for (i, step), result in zip(ready, outputs):
+                self._record_step_result(i, step, result, workflow_context, results)
+                done.add(i)
+        
+        results.sort(key=lambda r: r.step)
+    
+    @staticmethod
+    def _step_dependencies(i: int, step: Dict[str, Any], total_steps: int) -> set:
+        """Índices (base 0) dos steps dos quais o step depende: 'depends_on' + placeholders no input."""
+        numbers = set(step.get('depends_on', []))
+        numbers.update(int(ref) for ref in STEP_RESULT_PLACEHOLDER.findall(step.get('input', '')))
+        for number in numbers:
+            if not 1 <= number <= total_steps or number == i + 1:
+                raise ValueError(f"Dependência inválida no step {i+1}: {number}")
+        return {number - 1 for number in numbers}
+    
+    @staticmethod
+    def _resolve_step_input(step: Dict[str, Any], workflow_context: Dict) -> Dict[str, Any]:
+        """Substitui placeholders {step_N_result} do input pelos resultados já disponíveis."""
+        step_input = step.get('input', '')
+        if not isinstance(step_input, str) or '_result}' not in step_input:
+            return step
+        
+        def replace(match):
+            key = f"step_{match.group(1)}_result"
+            return str(workflow_context[key]) if key in workflow_context else match.group(0)
+        
+        return {**step, 'input': STEP_RESULT_PLACEHOLDER.sub(replace, step_input)}
+    
+    @staticmethod
+    def _record_step_result(i: int, step: Dict[str, Any], result: Any, workflow_context: Dict, results: List[StepResult]):
+        """Registra o resultado de um step na lista de resultados e no contexto do workflow."""
+        results.append(StepResult(i + 1, step.get('type', 'agent'), step.get('input', ''), result, True))
+        workflow_context[f'step_{i+1}_result'] = result
+    
+    def _group_steps(self, steps: List[Dict[str, Any]]) -> List[tuple]:
+        """
+        Agrupa steps consecutivos em modos de execução:
+        'parallel' (mesmo 'parallel_group'), 'batch' ('simple' independentes) ou 'single'.
+        """
+        groups: List[tuple] = []
+        for i, step in enumerate(steps):
+            group_id = step.get('parallel_group')
+            if group_id is not None:
+                mode = 'parallel'
+            elif self._is_batchable(step):
+                mode = 'batch'
+            else:
+                groups.append(('single', [(i, step)]))
+                continue
+            
+            if groups and groups[-1][0] == mode and groups[-1][1][-1][1].get('parallel_group') == group_id:
+                groups[-1][1].append((i, step))
+            else:
+                groups.append((mode, [(i, step)]))
+        
+        # Grupos com um único step não precisam de paralelismo nem batch
+        return [('single', group) if len(group) == 1 else (mode, group) for mode, group in groups]
+    
+    @staticmethod
+    def _is_batchable(step: Dict[str, Any]) -> bool:
+        """Steps 'simple' sem dependência de resultados anteriores podem ir no mesmo batch."""
+        return step.get('type', 'agent') == 'simple' and not STEP_RESULT_REF.search(step.get('input', ''))
+    
+    def _execute_step(self, i: int, step: Dict[str, Any]) -> Any:
+        """Executa um step do workflow de acordo com seu tipo."""
+        step_type = step.get('type', 'agent')
+        step_input = step.get('input', '')
+        step_config = step.get('config', {})
+        
+        if step_type == 'agent':
+            return self.invoke_agent(step_input, step_config.get('include_history', True))
+        elif step_type == 'simple':
+            return self.core.invoke_simple(step_input)
+        elif step_type == 'template':
+            template = step_config.get('template')
+            if template:
+                return self.core.invoke_with_template(template, **step_config.get('params', {}))
+            else:
+                raise ValueError(f"Template não fornecido para step {i+1}")
+        elif step_type == 'mcp_direct':
+            # Execução direta de MCP tool específica
+            tool_name = step_config.get('tool_name')
+            return self._execute_mcp_tool_direct(tool_name, step_input)
+        else:
+            raise ValueError(f"Tipo de step desconhecido: {step_type}")
+    
+    async def _execute_parallel_group(self, group: List[tuple]) -> List[Any]:
+        """Executa um grupo de steps independentes em paralelo, respeitando max_parallel_requests."""
+        semaphore = asyncio.Semaphore(self.max_parallel_requests)
+        return await asyncio.gather(
+            *[self._aexecute_step(i, step, semaphore, shared_history=False) for i, step in group]
+        )
+    
+    async def _aexecute_step(self, i: int, step: Dict[str, Any], semaphore: asyncio.Semaphore,
+                             shared_history: bool = False) -> Any:
+        """
+        Executa um step de forma assíncrona dentro do limite de concorrência.
+        Steps de agente que rodam junto com outros não leem nem gravam o histórico
+        (shared_history=False): turnos gravados ao mesmo tempo ficariam intercalados.
+        """
+        async with semaphore:
+            if step.get('type', 'agent') == 'agent':
+                requested = step.get('config', {}).get('include_history')
+                if shared_history:
+                    include_history = requested is not False
+                else:
+                    if requested:
+                        logger.warning("Step %s roda em paralelo: include_history ignorado", i + 1)
+                    include_history = False
+                return await self.ainvoke_agent(step.get('input', ''), include_history)
+            return await asyncio.to_thread(self._execute_step, i, step)
+    
     def _execute_mcp_tool_direct(self, tool_name: str, input_data: str) -> str:
         """Executa uma MCP tool específica diretamente."""
-        for tool in self.mcp_tools:
-            if tool.name == tool_name:
-                return tool.invoke(input_data)
-        raise ValueError(f"MCP tool '{tool_name}' não encontrada")
+        tool = self._mcp_tools_by_name.get(tool_name)
+        if tool is None:
+            raise ValueError(f"MCP tool '{tool_name}' não encontrada")
+        return tool.invoke(input_data)
     
     # ===============================
     # ACESSO AO CORE E HISTÓRICO - Bridge para funcionalidades básicas
@@ -362,15 +1212,69 @@ class MCPLangChainWorkflow:
     
     def clear_conversation_history(self) -> bool:
         """Limpa histórico de conversação. Útil para iniciar nova sessão MCP."""
+        self.reset_cache_anchor()
+        self._reset_history_summary()
         return self.core.clear_history()
     
     def get_conversation_history(self) -> List[Dict[str, str]]:
         """Retorna histórico formatado. Útil para análise ou backup de sessão MCP."""
         return self.core.get_history()
     
-    def load_conversation_history(self, history: List[Dict[str, str]]) -> bool:
-        """Carrega histórico salvo. Útil para restaurar sessões MCP."""
-        return self.core.load_history(history)
+    def iter_conversation_history(self) -> Iterator[Dict[str, str]]:
+        """Percorre o histórico formatado sob demanda. Útil para polling e exportação em streaming."""
+        return self.core.iter_history()
+    
+    def load_conversation_history(self, history: List[Dict[str, str]],
+                                  summary: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        Carrega histórico salvo. Útil para restaurar sessões MCP.
+        
+        Se o histórico recebido começa com o histórico atual (caso comum: o cliente
+        reenvia a conversa com o último turno, que já está aqui), só as mensagens
+        novas são acrescentadas. Resumo acumulado e anchor de cache são preservados,
+        então o resumo não é refeito a cada requisição.
+        
+        summary (ver get_history_summary) restaura o resumo salvo junto com o
+        histórico da sessão; um dict vazio descarta o resumo atual. Com None o
+        resumo só é mantido quando o histórico atual é prefixo do recebido.
+        """
+        common = self._common_history_prefix(history)
+        if common == self.core.get_history_length():
+            loaded = self.core.extend_history(history[common:])
+        else:
+            self.reset_cache_anchor()
+            self._reset_history_summary()
+            loaded = self.core.load_history(history)
+        
+        if summary is not None:
+            self._restore_history_summary(summary)
+        return loaded
+    
+    def get_history_summary(self) -> Dict[str, Any]:
+        """
+        Estado do resumo acumulado (texto e quantas mensagens ele cobre), para ser
+        guardado junto com o histórico da sessão e restaurado em load_conversation_history.
+        """
+        return {"summary": self._history_summary, "summarized_count": self._summarized_count}
+    
+    def _restore_history_summary(self, state: Dict[str, Any]):
+        """Aplica um estado salvo por get_history_summary; estados inconsistentes são descartados."""
+        summary = state.get("summary")
+        count = state.get("summarized_count", 0)
+        if not summary or not 0 <= count <= self.core.get_history_length():
+            self._reset_history_summary()
+            return
+        self._history_summary = summary
+        self._summarized_count = count
+    
+    def _common_history_prefix(self, history: List[Dict[str, str]]) -> int:
+        """Número de mensagens iniciais iguais entre o histórico atual e o recebido."""
+        count = 0
+        for stored, incoming in zip(self.core.iter_history(), history):
+            if stored["role"] != incoming.get("role") or stored["content"] != incoming.get("content"):
+                break
+            count += 1
+        return count
     
     def get_workflow_info(self) -> Dict[str, Any]:
         """
@@ -381,12 +1285,13 @@ class MCPLangChainWorkflow:
         core_info.update({
             'class_type': 'MCPLangChainWorkflow',
             'mcp_integration': True,
-            'tools_count': len(self.tools),
+            'tools_count': len(self._tools_by_name),
             'mcp_tools_count': len(self.mcp_tools),
             'available_tools': self.get_available_tools(),
             'mcp_tools': self.get_mcp_tools_info(),
             'agent_created': self.agent is not None,
             'agent_executor_created': self.agent_executor is not None,
+            'cache_read_input_tokens': self.run_callback.cache_read_input_tokens,
             'workflow_features': ['mcp_integration', 'tool_calling', 'multi_step_workflows', 'context_preservation', 'error_handling', 'custom_tools', 'auto_discovery']
         })
         return core_info
@@ -400,6 +1305,6 @@ class MCPLangChainWorkflow:
             'mcp_tools_info': self.get_mcp_tools_info(),
             'core_session': self.core.export_session(),
             'mcp_status': self.core.get_mcp_status(),
-            'timestamp': str(os.popen('echo %date% %time%').read().strip()) if os.name == 'nt' else str(os.popen('date').read().strip())
+            'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat()
         }
     
\ No newline at end of file
@@ -3,15 +3,23 @@ MCP Tools - Base Classes and Utilities
 Module with base classes and utilities for MCP tools.
 """
 
-import json
 import logging
 from abc import ABC, abstractmethod
+from functools import lru_cache
 from typing import Dict, Any, Optional
 
+from utils.json_utils import json_dumps
+
 # Logger configuration
 logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=None)
+def _tool_logger(name: str) -> logging.Logger:
+    """Per-tool logger, looked up once per name instead of on every instantiation."""
+    return logging.getLogger(f"mcp_tool.{name}")
+
+
 class MCPToolBase(ABC):
     """
     Abstract base class for all MCP tools.
@@ -21,7 +29,9 @@ class MCPToolBase(ABC):
     def __init__(self, name: str, description: str):
         self.name = name
         self.description = description
-        self.logger = logging.getLogger(f"mcp_tool.{name}")
+        self.logger = _tool_logger(name)
+        # Tools that keep the default (always True) validator skip the call in __call__
+        self._has_custom_validator = type(self).validate_input is not MCPToolBase.validate_input
     
     @abstractmethod
     def execute(self, *args, **kwargs) -> Dict[str, Any]:
@@ -44,24 +54,25 @@ class MCPToolBase(ABC):
         """
         return True
     
-    def format_response(self, result: Dict[str, Any]) -> str:
+    def format_response(self, result: Dict[str, Any], compact: bool = True) -> str:
         """
         Formats the response in MCP JSON standard.
         
         Args:
             result: Dictionary with execution result
+            compact: Compact JSON (default); False pretty-prints with 2-space indent
             
         Returns:
             str: Formatted JSON
         """
         try:
-            return json.dumps(result, ensure_ascii=False, indent=2)
+            return json_dumps(result, indent=not compact)
         except Exception as e:
             self.logger.error(f"Error formatting response: {e}")
-            return json.dumps({
+            return json_dumps({
                 "error": "Response formatting error",
                 "details": str(e)
-            }, ensure_ascii=False, indent=2)
+            })
     
     def handle_error(self, error: Exception, context: Optional[Dict] = None) -> str:
         """
@@ -94,7 +105,7 @@ class MCPToolBase(ABC):
         """
         try:
             # Input validation
-            if not self.validate_input(*args, **kwargs):
+            if self._has_custom_validator and not self.validate_input(*args, **kwargs):
                 return self.handle_error(
                     ValueError("Invalid input parameters"),
                     {"received_parameters": {"args": args, "kwargs": kwargs}}
@@ -122,14 +133,12 @@ class MCPResponseBuilder:
     
     def add_input_info(self, **kwargs) -> 'MCPResponseBuilder':
         """Adds information about the processed input."""
-        for key, value in kwargs.items():
-            self.response[f"{key}"] = value
+        self.response.update(kwargs)
         return self
     
     def add_result(self, **kwargs) -> 'MCPResponseBuilder':
         """Adds operation results."""
-        for key, value in kwargs.items():
-            self.response[key] = value
+        self.response.update(kwargs)
         return self
     
     def add_summary(self, summary: str) -> 'MCPResponseBuilder':
@@ -155,6 +164,16 @@ class MCPToolValidator:
     @staticmethod
     def validate_number(value: Any, field_name: str = "number") -> bool:
         """Validates that value is a valid number."""
+        # Fast path for numbers and plain decimal strings, without raising
+        if isinstance(value, (int, float)):
+            return True
+        if isinstance(value, str):
+            digits = value.strip()
+            if digits[:1] in ("+", "-"):
+                digits = digits[1:]
+            if digits.replace(".", "", 1).isdecimal():
+                return True
+        # Exponents, inf/nan, underscores, Decimal, numpy scalars...
         try:
             float(value)
             return True
@@ -3,18 +3,140 @@ Tool Wrappers - Módulo para conversão de funções em LangChain BaseTool
 Gerencia wrappers para MCP tools e tools tradicionais com parsing inteligente de parâmetros.
 """
 
+import json
 import logging
-from typing import List, Callable
-from langchain_core.tools import BaseTool, tool
+import os
+from typing import Any, ClassVar, Dict, List, Callable, Optional, Tuple, Type
+from langchain_core.pydantic_v1 import BaseModel, Field
+from langchain_core.tools import BaseTool
+from utils.json_utils import json_dumps
 
 logger = logging.getLogger(__name__)
 
+# Respostas das tools compactas por padrão (menos tokens para o modelo);
+# TOOL_PRETTY_JSON=1 volta a indentar para depuração
+TOOL_PRETTY_JSON = os.getenv('TOOL_PRETTY_JSON', '0') == '1'
+
+
+def _json_dumps(result: Any) -> str:
+    return json_dumps(result, indent=TOOL_PRETTY_JSON)
+
+# ===============================
+# HANDLERS - execução de tools tradicionais por tipo
+# ===============================
+
+def _exec_cep(tool_instance, input_text: str):
+    # Para CEP: simplesmente passa o texto como CEP
+    return tool_instance.execute(cep=input_text.strip())
+
+
+def _exec_product_search(tool_instance, input_text: str):
+    # Para busca de produtos
+    text = input_text.strip()
+    if text.startswith('{'):
+        params = json.loads(text)
+        return tool_instance.execute(**params)
+    return tool_instance.execute(query=text)
+
+
+def _exec_product_details(tool_instance, input_text: str):
+    # Para detalhes de produto
+    return tool_instance.execute(product_id=input_text.strip())
+
+
+def _exec_category_list(tool_instance, input_text: str):
+    # Para lista de categorias
+    return tool_instance.execute()
+
+
+def _exec_unified_agent(tool_instance, input_text: str):
+    # Para unified agent tool - resultado grande é resumido por _summarize_unified_agent
+    return tool_instance.execute(query=input_text.strip())
+
+
+def _exec_generic(tool_instance, input_text: str):
+    # Fallback genérico
+    return tool_instance.execute(input_text)
+
+
+# ===============================
+# RESUMOS - limite de tamanho das respostas enviadas ao modelo
+# ===============================
+
+MAX_RESULT_CHARS = 3000
+
+
+def _summarize_unified_agent(result: dict) -> dict:
+    # Versão resumida para evitar token overflow
+    return {
+        "success": result.get("success", False),
+        "query": result.get("query", ""),
+        "products_found": len(result.get("final_products", [])),
+        "sample_products": result.get("final_products", [])[:3],  # Apenas 3 produtos
+        "summary": result.get("summary", {})
+    }
+
+
+def _summarize_bestseller(result: dict) -> dict:
+    return {
+        "success": result.get("success", False),
+        "query": result.get("query", ""),
+        "search_type": result.get("search_type", ""),
+        "products_found": len(result.get("final_products", [])),
+        "sample_products": result.get("final_products", [])[:5],  # Apenas 5 produtos
+        "summary": result.get("summary", {})
+    }
+
+
+def _dumps_capped(result, summarize: Optional[Callable[[dict], dict]] = None) -> str:
+    """
+    Serializa o resultado uma única vez; se um dict passar de MAX_RESULT_CHARS,
+    devolve o resumo serializado no lugar (sem o str(dict) descartável de antes).
+    """
+    serialized = _json_dumps(result)
+    if summarize is not None and isinstance(result, dict) and len(serialized) > MAX_RESULT_CHARS:
+        return _json_dumps(summarize(result))
+    return serialized
+
+
+class _ToolInput(BaseModel):
+    input_text: str = Field(description="Input do usuário para a tool")
+
+
+class _PreparsedTool(BaseTool):
+    """
+    BaseTool de entrada única (input_text) que delega a um runner já resolvido.
+    Substitui o @tool aninhado por wrapper: o schema de entrada é o mesmo para
+    todas as tools e é montado uma vez, sem introspecção da função a cada wrap.
+    """
+    name: str
+    description: str
+    args_schema: Type[BaseModel] = _ToolInput
+    func: Any  # função MCP ou instância de tool tradicional (com execute)
+    runner: Callable[[Callable, str], str]
+    
+    def _run(self, input_text: str) -> str:
+        return self.runner(self.func, input_text)
+
 
 class ToolWrapper:
     """
     Classe responsável por criar wrappers LangChain compatíveis para diferentes tipos de tools.
     """
     
+    # Trecho do nome da tool (minúsculo) -> (handler, resumo); a primeira entrada que casar vence
+    _TRADITIONAL_DISPATCH = (
+        ("cep", _exec_cep, None),
+        ("product_search", _exec_product_search, None),
+        ("product_details", _exec_product_details, None),
+        ("category_list", _exec_category_list, None),
+        ("unified_agent", _exec_unified_agent, _summarize_unified_agent),
+    )
+    # Nome da tool tradicional -> (handler, resumo), resolvido uma vez por nome
+    _traditional_handlers: ClassVar[Dict[str, Tuple[Callable, Optional[Callable]]]] = {}
+    # Nome da função MCP -> parser; preenchido após o corpo da classe
+    _MCP_PARSERS: ClassVar[Dict[str, Callable]] = {}
+    
     @staticmethod
     def create_mcp_wrapper(original_func: Callable) -> BaseTool:
         """
@@ -26,20 +148,12 @@ class ToolWrapper:
         Returns:
             BaseTool: Tool LangChain compatível
         """
-        @tool
-        def wrapped_tool(input_text: str) -> str:
-            """MCP tool wrapper with intelligent parameter parsing"""
-            try:
-                func_name = original_func.__name__
-                return ToolWrapper._execute_mcp_function(original_func, func_name, input_text)
-            except Exception as e:
-                logger.error(f"Erro na execução da tool {original_func.__name__}: {e}")
-                return f"Erro na execução da tool {original_func.__name__}: {str(e)}"
-        
-        # Define nome e descrição do tool
-        wrapped_tool.name = original_func.__name__
-        wrapped_tool.description = original_func.__doc__ or f"MCP tool: {original_func.__name__}"
-        return wrapped_tool
+        return _PreparsedTool(
+            name=original_func.__name__,
+            description=original_func.__doc__ or f"MCP tool: {original_func.__name__}",
+            func=original_func,
+            runner=ToolWrapper._run_mcp,
+        )
     
     @staticmethod
     def create_traditional_wrapper(original_func: Callable) -> BaseTool:
@@ -52,40 +166,55 @@ class ToolWrapper:
         Returns:
             BaseTool: Tool LangChain compatível
         """
-        @tool
-        def wrapped_traditional_tool(input_text: str) -> str:
-            """Traditional tool wrapper"""
-            try:
-                # Se é uma instância de tool (tem método execute)
-                if hasattr(original_func, 'execute'):
-                    func_name = original_func.name if hasattr(original_func, 'name') else str(original_func.__class__.__name__)
-                    return ToolWrapper._execute_traditional_tool(original_func, func_name, input_text)
-                else:
-                    # É uma função simples
-                    return original_func(input_text)
-            except Exception as e:
-                logger.error(f"Erro na execução da tool {original_func.__name__ if hasattr(original_func, '__name__') else str(original_func)}: {e}")
-                return f"Erro na execução da tool: {str(e)}"
-        
         # Define nome e descrição do tool
         if hasattr(original_func, 'name'):
-            wrapped_traditional_tool.name = original_func.name
+            name = original_func.name
         elif hasattr(original_func, '__name__'):
-            wrapped_traditional_tool.name = original_func.__name__
+            name = original_func.__name__
         else:
-            wrapped_traditional_tool.name = str(original_func.__class__.__name__)
+            name = str(original_func.__class__.__name__)
         
         if hasattr(original_func, 'description'):
-            wrapped_traditional_tool.description = original_func.description
+            description = original_func.description
         elif hasattr(original_func, '__doc__'):
-            wrapped_traditional_tool.description = original_func.__doc__ or f"Tool: {wrapped_traditional_tool.name}"
+            description = original_func.__doc__ or f"Tool: {name}"
         else:
-            wrapped_traditional_tool.description = f"Tool: {wrapped_traditional_tool.name}"
-            
-        return wrapped_traditional_tool
+            description = f"Tool: {name}"
+        
+        return _PreparsedTool(
+            name=name,
+            description=description,
+            func=original_func,
+            runner=ToolWrapper._run_traditional,
+        )
+    
+    @staticmethod
+    def _run_mcp(original_func: Callable, input_text: str) -> str:
+        """MCP tool wrapper with intelligent parameter parsing"""
+        try:
+            func_name = original_func.__name__
+            return ToolWrapper._execute_mcp_function(original_func, func_name, input_text)
+        except Exception as e:
+            logger.error("Erro na execução da tool %s: %s", original_func.__name__, e)
+            return f"Erro na execução da tool {original_func.__name__}: {str(e)}"
     
     @staticmethod
-    def _execute_traditional_tool(tool_instance, tool_name: str, input_text: str) -> str:
+    def _run_traditional(original_func: Callable, input_text: str) -> str:
+        """Traditional tool wrapper"""
+        try:
+            # Se é uma instância de tool (tem método execute)
+            if hasattr(original_func, 'execute'):
+                func_name = original_func.name if hasattr(original_func, 'name') else str(original_func.__class__.__name__)
+                return ToolWrapper._execute_traditional_tool(original_func, func_name, input_text)
+            else:
+                # É uma função simples
+                return original_func(input_text)
+        except Exception as e:
+            logger.error("Erro na execução da tool %s: %s", getattr(original_func, '__name__', original_func), e)
+            return f"Erro na execução da tool: {str(e)}"
+    
+    @classmethod
+    def _execute_traditional_tool(cls, tool_instance, tool_name: str, input_text: str) -> str:
         """
         Executa tool tradicional com parsing específico.
         
@@ -97,49 +226,29 @@ class ToolWrapper:
         Returns:
             str: Resultado da execução
         """
-        import json
-        
         try:
-            # Parsers específicos para tools tradicionais
-            if "cep" in tool_name.lower():
-                # Para CEP: simplesmente passa o texto como CEP
-                result = tool_instance.execute(cep=input_text.strip())
-            elif "product_search" in tool_name.lower():
-                # Para busca de produtos
-                if input_text.strip().startswith('{'):
-                    params = json.loads(input_text)
-                    result = tool_instance.execute(**params)
-                else:
-                    result = tool_instance.execute(query=input_text.strip())
-            elif "product_details" in tool_name.lower():
-                # Para detalhes de produto
-                result = tool_instance.execute(product_id=input_text.strip())
-            elif "category_list" in tool_name.lower():
-                # Para lista de categorias
-                result = tool_instance.execute()
-            elif "unified_agent" in tool_name.lower():
-                # Para unified agent tool - usar limite baixo para evitar token overflow
-                result = tool_instance.execute(query=input_text.strip())
-                # Se o resultado for muito grande, resumir
-                if isinstance(result, dict) and len(str(result)) > 3000:
-                    # Criar versão resumida
-                    summary = {
-                        "success": result.get("success", False),
-                        "query": result.get("query", ""),
-                        "products_found": len(result.get("final_products", [])),
-                        "sample_products": result.get("final_products", [])[:3],  # Apenas 3 produtos
-                        "summary": result.get("summary", {})
-                    }
-                    result = summary
-            else:
-                # Fallback genérico
-                result = tool_instance.execute(input_text)
-            
-            return json.dumps(result, indent=2, ensure_ascii=False)
+            handler, summarize = cls._traditional_handler(tool_name)
+            return _dumps_capped(handler(tool_instance, input_text), summarize)
             
         except Exception as e:
             return f"Erro ao executar {tool_name}: {str(e)}"
     
+    @classmethod
+    def _traditional_handler(cls, tool_name: str) -> Tuple[Callable, Optional[Callable]]:
+        """
+        Resolve (handler, resumo) de uma tool tradicional pelo nome (uma vez por nome).
+        Mantém a regra de substring da tabela, na ordem em que foi declarada.
+        """
+        entry = cls._traditional_handlers.get(tool_name)
+        if entry is None:
+            lowered = tool_name.lower()
+            entry = next(
+                ((h, summarize) for key, h, summarize in cls._TRADITIONAL_DISPATCH if key in lowered),
+                (_exec_generic, None),
+            )
+            cls._traditional_handlers[tool_name] = entry
+        return entry
+    
     @staticmethod
     def _execute_mcp_function(func: Callable, func_name: str, input_text: str) -> str:
         """
@@ -153,46 +262,25 @@ class ToolWrapper:
         Returns:
             str: Resultado da execução da função
         """
-        # Mapeamento de funções e seus parsers específicos
-        parsers = {
-            "contador_caracteres": ToolWrapper._parse_contador_caracteres,
-            "calculadora_basica": ToolWrapper._parse_calculadora_basica,
-            "analisar_texto": ToolWrapper._parse_analisar_texto,
-            "gerar_hash": ToolWrapper._parse_gerar_hash,
-            "consulta_endereco_por_cep": ToolWrapper._parse_consulta_cep,
-            "product_search_tool": ToolWrapper._parse_product_search,
-            "product_details_tool": ToolWrapper._parse_product_details,
-            "category_list_tool": ToolWrapper._parse_category_list,
-            "bestseller_products_tool": ToolWrapper._parse_bestseller_products,
-            "unified_agent_tool": ToolWrapper._parse_bestseller_products,  # Usar mesmo parser
-            "unified_product_search_tool": ToolWrapper._parse_unified_product_search,  # Nova ferramenta
-        }
-        
         # Usa parser específico se disponível, senão executa diretamente
-        if func_name in parsers:
-            return parsers[func_name](func, input_text)
-        else:
-            return func(input_text)
+        parser = ToolWrapper._MCP_PARSERS.get(func_name)
+        return parser(func, input_text) if parser else func(input_text)
     
     @staticmethod
     def _parse_consulta_cep(func: Callable, input_text: str) -> str:
         """Parser para consulta_endereco_por_cep: cep"""
-        import json
         try:
             # Para funções MCP, chama diretamente
             result = func(cep=input_text.strip())
             if isinstance(result, str):
                 return result
-            return json.dumps(result, indent=2, ensure_ascii=False)
+            return _json_dumps(result)
         except Exception as e:
             return f"Erro ao consultar CEP: {str(e)}"
     
     @staticmethod
     def _parse_bestseller_products(func: Callable, input_text: str) -> str:
         """Parser inteligente para unified_agent_tool: análise automática de linguagem natural"""
-        import json
-        import re
-        
         try:
             # Para unified_agent_tool, sempre usar execute com query
             result = func(query=input_text.strip())
@@ -200,63 +288,49 @@ class ToolWrapper:
             # Se o resultado já é uma string JSON, retorna diretamente
             if isinstance(result, str):
                 return result
-            else:
-                # Para dicionários grandes, fazer resumo
-                if isinstance(result, dict) and len(str(result)) > 3000:
-                    summary = {
-                        "success": result.get("success", False),
-                        "query": result.get("query", ""),
-                        "search_type": result.get("search_type", ""),
-                        "products_found": len(result.get("final_products", [])),
-                        "sample_products": result.get("final_products", [])[:5],  # Apenas 5 produtos
-                        "summary": result.get("summary", {})
-                    }
-                    result = summary
-                
-                return json.dumps(result, indent=2, ensure_ascii=False)
+            # Para dicionários grandes, fazer resumo
+            return _dumps_capped(result, _summarize_bestseller)
         except Exception as e:
             return f"Erro ao buscar produtos: {str(e)}"
     
     @staticmethod
     def _parse_product_search(func: Callable, input_text: str) -> str:
         """Parser para product_search_tool: query[,category,price_min,price_max,sort_by,sort_order]"""
-        import json
         try:
             # Tenta parsing JSON se o input parecer um JSON
-            if input_text.strip().startswith('{'):
-                params = json.loads(input_text)
+            text = input_text.strip()
+            if text.startswith('{'):
+                params = json.loads(text)
                 result = func(**params)
             else:
                 # Parsing simples para texto
-                result = func(query=input_text.strip())
+                result = func(query=text)
             
             if isinstance(result, str):
                 return result
-            return json.dumps(result, indent=2, ensure_ascii=False)
+            return _json_dumps(result)
         except Exception as e:
             return f"Erro ao buscar produtos: {str(e)}"
     
     @staticmethod
     def _parse_product_details(func: Callable, input_text: str) -> str:
         """Parser para product_details_tool: product_id"""
-        import json
         try:
             result = func(product_id=input_text.strip())
             if isinstance(result, str):
                 return result
-            return json.dumps(result, indent=2, ensure_ascii=False)
+            return _json_dumps(result)
         except Exception as e:
             return f"Erro ao obter detalhes do produto: {str(e)}"
     
     @staticmethod
     def _parse_category_list(func: Callable, input_text: str) -> str:
         """Parser para category_list_tool: sem parâmetros"""
-        import json
         try:
             result = func()
             if isinstance(result, str):
                 return result
-            return json.dumps(result, indent=2, ensure_ascii=False)
+            return _json_dumps(result)
         except Exception as e:
             return f"Erro ao listar categorias: {str(e)}"
     
@@ -306,10 +380,26 @@ class ToolWrapper:
             # Para a ferramenta de busca de produtos, sempre usar execute com query
             return func.execute(query=input_text)
         except Exception as e:
-            logger.error(f"Erro no parser unified_product_search: {e}")
+            logger.error("Erro no parser unified_product_search: %s", e)
             return f"Erro na busca de produtos: {str(e)}"
 
 
+# Mapeamento de funções e seus parsers específicos (montado uma vez, na carga do módulo)
+ToolWrapper._MCP_PARSERS = {
+    "contador_caracteres": ToolWrapper._parse_contador_caracteres,
+    "calculadora_basica": ToolWrapper._parse_calculadora_basica,
+    "analisar_texto": ToolWrapper._parse_analisar_texto,
+    "gerar_hash": ToolWrapper._parse_gerar_hash,
+    "consulta_endereco_por_cep": ToolWrapper._parse_consulta_cep,
+    "product_search_tool": ToolWrapper._parse_product_search,
+    "product_details_tool": ToolWrapper._parse_product_details,
+    "category_list_tool": ToolWrapper._parse_category_list,
+    "bestseller_products_tool": ToolWrapper._parse_bestseller_products,
+    "unified_agent_tool": ToolWrapper._parse_bestseller_products,  # Usar mesmo parser
+    "unified_product_search_tool": ToolWrapper._parse_unified_product_search,  # Nova ferramenta
+}
+
+
 class ToolDiscovery:
     """
     Classe responsável por descoberta e carregamento de tools MCP e tradicionais.
@@ -326,10 +416,6 @@ class ToolDiscovery:
             List[BaseTool]: Lista de MCP tools convertidas para LangChain
         """
         try:
-            # Import com caminho absoluto
-            import sys
-            import os
-            sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
             from mcp_files.server.mcp_tools_server import get_mcp_tools_functions
             mcp_functions = get_mcp_tools_functions()
             
@@ -338,14 +424,14 @@ class ToolDiscovery:
                 wrapped = ToolWrapper.create_mcp_wrapper(func)
                 mcp_tools.append(wrapped)
             
-            self.logger.info(f"Carregadas {len(mcp_tools)} MCP tools do servidor")
+            self.logger.info("Carregadas %d MCP tools do servidor", len(mcp_tools))
             return mcp_tools
             
         except ImportError as e:
-            self.logger.warning(f"MCP server não disponível: {e}")
+            self.logger.warning("MCP server não disponível: %s", e)
             raise
         except Exception as e:
-            self.logger.error(f"Erro ao carregar MCP tools: {e}")
+            self.logger.error("Erro ao carregar MCP tools: %s", e)
             raise
     
     def discover_traditional_tools(self) -> List[BaseTool]:
@@ -356,9 +442,6 @@ class ToolDiscovery:
             List[BaseTool]: Lista de tools tradicionais convertidas para LangChain
         """
         try:
-            import sys
-            import os
-            sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
             from mcp_files.core.tool_loader import get_all_tools
             traditional_functions = get_all_tools()
             
@@ -367,14 +450,14 @@ class ToolDiscovery:
                 wrapped = ToolWrapper.create_traditional_wrapper(func)
                 traditional_tools.append(wrapped)
             
-            self.logger.info(f"Carregadas {len(traditional_tools)} tools tradicionais")
+            self.logger.info("Carregadas %d tools tradicionais", len(traditional_tools))
             return traditional_tools
             
         except ImportError as e:
-            self.logger.warning(f"Tools tradicionais não disponíveis: {e}")
+            self.logger.warning("Tools tradicionais não disponíveis: %s", e)
             raise
         except Exception as e:
-            self.logger.error(f"Erro ao carregar tools tradicionais: {e}")
+            self.logger.error("Erro ao carregar tools tradicionais: %s", e)
             raise
     
     def discover_all_tools(self) -> List[BaseTool]:
@@ -401,6 +484,8 @@ class ToolDiscovery:
 def get_tool_discovery() -> ToolDiscovery:
     """
     Factory function para obter instância de ToolDiscovery.
+    O resultado da descoberta é cacheado pelo chamador
+    (MCPLangChainWorkflow._discovered_tools), não aqui.
     
     Returns:
         ToolDiscovery: Instância configurada
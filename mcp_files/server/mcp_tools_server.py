@@ -6,14 +6,18 @@ Arquitetura refatorada com separação de responsabilidades e código limpo.
 import logging
 from typing import List, Callable, Dict, Any
 
+# Configuração do logger
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
 # Lambda-compatible FastMCP implementation
 try:
     from mcp.server.fastmcp import FastMCP
-    print("Using original FastMCP implementation")
+    logger.debug("Using original FastMCP implementation")
 except ImportError:
     # CORREÇÃO: Alterado o import para ser absoluto
     from mcp_files.server.lambda_fastmcp import FastMCP
-    print("Using Lambda-compatible FastMCP implementation")
+    logger.debug("Using Lambda-compatible FastMCP implementation")
 
 # CORREÇÃO: Imports alterados para caminhos absolutos e corretos,
 # incluindo todas as classes de ferramentas MCP disponíveis.
@@ -23,11 +27,6 @@ from tools.text_tools import ContadorCaracteres, AnalisadorTexto, AnalisadorSent
 from tools.utility_tools import CalculadoraBasica, GeradorHash
 
 
-# Configuração do logger
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
-
-
 class MCPToolsRegistry:
     """
     Registro centralizado de todas as MCP tools disponíveis.
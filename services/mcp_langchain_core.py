@@ -1,13 +1,81 @@
 import os
+import datetime
 from langchain_aws import ChatBedrock, ChatBedrockConverse
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_community.chat_message_histories import ChatMessageHistory
 from langchain.schema import HumanMessage, AIMessage, SystemMessage
-from typing import List, Dict, Optional, Any
+from botocore.config import Config
+from typing import List, Dict, Optional, Any, Tuple, Iterator, Literal
 import logging
 
-from dotenv import load_dotenv
-load_dotenv()
+# Garante que o .env seja lido no máximo uma vez por processo
+_ENV_LOADED = False
+
+
+def load_env_once() -> bool:
+    """
+    Carrega o .env apenas na primeira chamada. Retorna True se carregou agora.
+    No AWS Lambda (AWS_EXECUTION_ENV definido) as variáveis já vêm do runtime,
+    então nem o python-dotenv é importado.
+    """
+    global _ENV_LOADED
+    if _ENV_LOADED:
+        return False
+    if not os.environ.get('AWS_EXECUTION_ENV'):
+        from dotenv import load_dotenv
+        load_dotenv()
+    _ENV_LOADED = True
+    return True
+
+
+def reload_env() -> bool:
+    """
+    Força uma nova leitura do .env, sobrescrevendo variáveis já definidas no
+    processo (load_dotenv(override=True)). Útil em testes. No AWS Lambda não faz
+    nada além de marcar o ambiente como carregado.
+    """
+    global _ENV_LOADED
+    if not os.environ.get('AWS_EXECUTION_ENV'):
+        from dotenv import load_dotenv
+        load_dotenv(override=True)
+    _ENV_LOADED = True
+    return True
+
+# Modelos com inferência latency-optimized no Bedrock (perfis cross-region). Só entram
+# os que usam ChatBedrockConverse (família Nova), o único cliente que repassa
+# performanceConfig; para os demais o pedido cai silenciosamente para "standard"
+LATENCY_OPTIMIZED_MODELS = (
+    "amazon.nova-pro",
+)
+
+# Caches de respostas por backend, compartilhados pelos modelos determinísticos do processo
+LLM_CACHE_SIZE = int(os.getenv('LLM_CACHE_SIZE', '256'))
+_RESPONSE_CACHES: Dict[str, Any] = {}
+
+
+def get_response_cache(backend: str):
+    """
+    Retorna o cache de respostas do backend ("memory" ou "redis"), criando-o na
+    primeira chamada. O InMemoryCache é limitado a LLM_CACHE_SIZE entradas.
+    Retorna None para "none".
+    """
+    if backend == "none":
+        return None
+    cache = _RESPONSE_CACHES.get(backend)
+    if cache is None:
+        if backend == "redis":
+            import redis
+            from langchain_community.cache import RedisCache
+            client = redis.Redis.from_url(os.getenv('REDIS_URL', 'redis://localhost:6379'))
+            cache = RedisCache(redis_=client, ttl=2 * 60 * 60)
+        else:
+            from langchain_core.caches import InMemoryCache
+            cache = InMemoryCache(maxsize=LLM_CACHE_SIZE)
+        _RESPONSE_CACHES[backend] = cache
+    return cache
+
+# Pool de conexões dimensionado para chamadas concorrentes (I/O-bound) ao Bedrock
+BEDROCK_CLIENT_CONFIG = Config(max_pool_connections=max(50, (os.cpu_count() or 1) * 5))
 
 class MCPLangChainCore:
     """
@@ -24,9 +92,14 @@ class MCPLangChainCore:
     - Interface unificada para reduzir complexidade
     """
     
+    # Clientes Bedrock compartilhados entre instâncias com a mesma configuração
+    _model_cache: Dict[Tuple, Any] = {}
+    
     def __init__(self, model_id: Optional[str] = None, region: str = 'us-east-1', 
                  temperature: float = 0.0, max_tokens: Optional[int] = None, 
-                 top_p: Optional[float] = None, load_env: bool = True):
+                 top_p: Optional[float] = None, load_env: bool = True,
+                 latency: Literal["standard", "optimized"] = "standard",
+                 cache_backend: Literal["memory", "redis", "none"] = "none"):
         """
         Inicializa a classe MCP LangChain core.
         
@@ -37,11 +110,20 @@ class MCPLangChainCore:
             max_tokens: Limite máximo de tokens na resposta
             top_p: Nucleus sampling parameter (0.0-1.0)
             load_env: Carrega variáveis de ambiente automaticamente
+            latency: "optimized" usa performanceConfig latency-optimized do Bedrock
+                quando o modelo suporta (ver LATENCY_OPTIMIZED_MODELS)
+            cache_backend: Cache de respostas aplicado só a este modelo quando a
+                temperatura efetiva é 0: "memory", "redis" (usa REDIS_URL) ou "none"
         """
         self.region = region
+        self.cache_backend = cache_backend
         self.temperature = temperature
         self.max_tokens = max_tokens
         self.top_p = top_p
+        
+        # Carrega variáveis de ambiente (uma vez por processo)
+        if load_env:
+            load_env_once()
                 
         # Logger
         self.logger = logging.getLogger(__name__)
@@ -51,27 +133,74 @@ class MCPLangChainCore:
         if not self.model_id:
             raise ValueError("Model ID deve ser fornecido ou definido na variável BEDROCK_MODEL_ID")
         
-        # Inicializa o modelo e histórico
-        self.llm = self._initialize_model()
+        # Latency-optimized só é pedido para modelos suportados
+        self.latency = latency if latency == "optimized" and self.supports_latency_optimized else "standard"
+        
+        # Inicializa o modelo (reaproveitando cliente já aquecido) e histórico
+        self.llm = self._get_model()
         self.chat_history = ChatMessageHistory()
         self.conversation_template = None
         
         # Define região AWS
         os.environ['AWS_REGION'] = self.region
     
+    def _get_model(self):
+        """
+        Retorna o cliente do modelo para a configuração atual, reutilizando um já criado.
+        Evita nova sessão boto3 e novo handshake TLS a cada instância. O histórico
+        continua sendo por instância; apenas o cliente é compartilhado.
+        """
+        key = (self.model_id, self.region, self.temperature, self.max_tokens, self.top_p,
+               self.latency, self.cache_backend)
+        llm = MCPLangChainCore._model_cache.get(key)
+        if llm is None:
+            llm = self._initialize_model()
+            MCPLangChainCore._model_cache[key] = llm
+        return llm
+    
+    @classmethod
+    def clear_model_cache(cls):
+        """Descarta os clientes compartilhados. Útil em testes."""
+        cls._model_cache.clear()
+    
+    @property
+    def supports_latency_optimized(self) -> bool:
+        """Indica se o modelo configurado aceita inferência latency-optimized."""
+        model_id = self.model_id.lower()
+        return any(model in model_id for model in LATENCY_OPTIMIZED_MODELS)
+    
+    @property
+    def effective_latency(self) -> str:
+        """
+        Modo de latência realmente aplicado ao cliente. performanceConfig só é
+        repassado pelo ChatBedrockConverse; no ChatBedrock fica "standard".
+        """
+        performance_config = getattr(self.llm, 'performance_config', None) or {}
+        return performance_config.get('latency', 'standard')
+    
     def _initialize_model(self):
         """Inicializa o modelo ChatBedrock com as configurações especificadas."""
         
         # Configurações específicas para Amazon Nova
         if 'nova' in self.model_id.lower():
             # Para Amazon Nova, usar ChatBedrockConverse para resolver problema com tools
-            return ChatBedrockConverse(
+            temperature = 0.7 if self.temperature == 0.0 else self.temperature
+            converse_kwargs = dict(
                 model=self.model_id, 
                 region_name=self.region,
-                temperature = 0.7 if self.temperature == 0.0 else self.temperature,
+                temperature = temperature,
                 max_tokens = 2048 if self.max_tokens is None else self.max_tokens,
-                top_p = 0.9 if self.top_p is None else self.top_p
+                top_p = 0.9 if self.top_p is None else self.top_p,
+                config=BEDROCK_CLIENT_CONFIG,
+                cache=self._response_cache(temperature)
             )
+            if self.latency == "optimized":
+                try:
+                    return ChatBedrockConverse(**converse_kwargs, performance_config={"latency": "optimized"})
+                except Exception as e:
+                    # Versões antigas do langchain-aws não repassam performanceConfig
+                    self.logger.warning(f"performance_config não suportado pelo langchain-aws instalado: {e}")
+            return ChatBedrockConverse(**converse_kwargs)
         else:
             # Para outros modelos, usar configuração padrão ChatBedrock
             model_kwargs = {
@@ -82,14 +211,29 @@ class MCPLangChainCore:
                 model_kwargs['max_tokens'] = self.max_tokens
             if self.top_p is not None:
                 model_kwargs['top_p'] = self.top_p
-                
+            
             return ChatBedrock(
                 model_id=self.model_id, 
                 model_kwargs=model_kwargs, 
                 region_name=self.region,
-                streaming=True
+                streaming=True,
+                config=BEDROCK_CLIENT_CONFIG,
+                cache=self._response_cache(self.temperature)
             )
     
+    def _response_cache(self, temperature: float):
+        """
+        Cache de respostas do modelo: só com temperatura efetiva 0, que é reprodutível.
+        A chave inclui o prompt completo (com scratchpad e saídas de tools).
+        O LangChain só consulta o cache em invoke/batch, nunca em stream/astream.
+        """
+        return get_response_cache(self.cache_backend) if temperature == 0 else None
+    
+    @property
+    def has_response_cache(self) -> bool:
+        """Indica se o modelo atual tem cache de respostas (ver _response_cache)."""
+        return getattr(self.llm, 'cache', None) is not None
+    
     # ===============================
     # MÉTODOS DE INFERÊNCIA SIMPLES - Base para MCP integration
     # ===============================
@@ -106,6 +250,36 @@ class MCPLangChainCore:
             self.logger.error(f"Erro na inferência simples: {e}")
             raise
     
+    async def ainvoke_simple(self, prompt: str) -> str:
+        """Versão assíncrona de invoke_simple, para uso dentro de um event loop."""
+        try:
+            result = await self.llm.ainvoke(prompt)
+            return result.content
+        except Exception as e:
+            self.logger.error(f"Erro na inferência simples assíncrona: {e}")
+            raise
+    
+    def invoke_batch(self, prompts: List[str], max_concurrency: Optional[int] = None) -> List[str]:
+        """
+        Executa várias inferências simples independentes em uma única chamada batch.
+        Útil para workflows com múltiplos prompts sem dependência entre si.
+        """
+        try:
+            results = self.llm.batch(prompts, config={"max_concurrency": max_concurrency})
+            return [result.content for result in results]
+        except Exception as e:
+            self.logger.error(f"Erro na inferência em batch: {e}")
+            raise
+    
+    async def ainvoke_batch(self, prompts: List[str], max_concurrency: Optional[int] = None) -> List[str]:
+        """Versão assíncrona de invoke_batch."""
+        try:
+            results = await self.llm.abatch(prompts, config={"max_concurrency": max_concurrency})
+            return [result.content for result in results]
+        except Exception as e:
+            self.logger.error(f"Erro na inferência em batch: {e}")
+            raise
+    
     def create_prompt_template(self, system_prompt: str, include_user_input: bool = True) -> ChatPromptTemplate:
         """
         Cria um template de prompt básico.
@@ -186,22 +360,28 @@ class MCPLangChainCore:
             self.logger.error(f"Erro ao limpar histórico: {e}")
             return False
     
-    def get_history(self) -> List[Dict[str, str]]:
-        """Retorna o histórico formatado. Essencial para MCP state management."""
-        history = []
+    def iter_history(self) -> Iterator[Dict[str, str]]:
+        """Percorre o histórico formatado sob demanda, sem materializar a lista."""
         for message in self.chat_history.messages:
             if isinstance(message, HumanMessage):
-                history.append({"role": "user", "content": message.content})
+                yield {"role": "user", "content": message.content}
             elif isinstance(message, AIMessage):
-                history.append({"role": "assistant", "content": message.content})
+                yield {"role": "assistant", "content": message.content}
             elif isinstance(message, SystemMessage):
-                history.append({"role": "system", "content": message.content})
-        return history
+                yield {"role": "system", "content": message.content}
+    
+    def get_history(self) -> List[Dict[str, str]]:
+        """Retorna o histórico formatado. Essencial para MCP state management."""
+        return list(self.iter_history())
     
     def load_history(self, history: List[Dict[str, str]]) -> bool:
         """Carrega um histórico de conversação. Crucial para MCP session restoration."""
+        self.chat_history.clear()
+        return self.extend_history(history)
+    
+    def extend_history(self, history: List[Dict[str, str]]) -> bool:
+        """Acrescenta mensagens ao histórico atual, no mesmo formato de load_history."""
         try:
-            self.chat_history.clear()
             for msg in history:
                 if msg["role"] == "user":
                     self.chat_history.add_user_message(msg["content"])
@@ -248,7 +428,7 @@ class MCPLangChainCore:
             self.top_p = top_p
         
         # Reinicializa o modelo
-        self.llm = self._initialize_model()
+        self.llm = self._get_model()
     
     def get_model_info(self) -> Dict[str, Any]:
         """Retorna informações sobre o modelo e configuração atual."""
@@ -258,6 +438,7 @@ class MCPLangChainCore:
             'temperature': self.temperature,
             'max_tokens': self.max_tokens,
             'top_p': self.top_p,
+            'latency': self.effective_latency,
             'framework': 'LangChain',
             'service': 'Amazon Bedrock',
             'class_type': 'MCPLangChainCore',
@@ -280,7 +461,7 @@ class MCPLangChainCore:
             'model_info': self.get_model_info(),
             'history': self.get_history(),
             'mcp_session': True,
-            'timestamp': str(os.popen('echo %date% %time%').read().strip()) if os.name == 'nt' else str(os.popen('date').read().strip())
+            'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat()
         }
     
     def get_mcp_status(self) -> Dict[str, Any]:
@@ -1,6 +1,4 @@
-import os
 import json
-import pandas as pd
 
 class PromptTemplate:
     """
@@ -9,29 +7,10 @@ class PromptTemplate:
     text analysis, and user support through text interaction.
     """
 
-    def __init__(self, user_query, context_data=None):
-        """
-        Initializes the class with user query and context data.
-        
-        Args:
-            user_query (str): User query/question about tasks or assistance.
-            context_data (dict, optional): Additional user context data.
-        """
-        self.user_query = user_query
-        self.context_data = context_data if context_data is not None else {}
-        
-        # Create the prompt template
-        self.create_prompt_template()
-
-    def create_prompt_template(self):
-        """
-        Generates the prompt for the AI Assistant based on project requirements.
-        
-        Returns:
-            str: The formatted prompt for the assistant.
-        """
-        self.prompt = f"""
-        <context>
+    # Static sections, identical for every query. Kept apart from the session
+    # block so they can be sent as a cacheable system prompt prefix.
+    # (Template syntax: literal braces are doubled.)
+    _PROMPT_HEAD = """        <context>
             You are an intelligent and helpful chat assistant, capable of helping users with various 
             daily tasks. You have multiple functionalities to assist with different needs, from 
             character counting to text analysis and other utilities.
@@ -108,9 +87,9 @@ class PromptTemplate:
 
         <response_format>
             ALWAYS provide responses in simple JSON format with only ONE main key:
-            {{{{
+            {{
             "resposta": "Your complete answer here - be direct, clear and conversational. Include all necessary details in natural and fluent text."
-            }}}}
+            }}
             
             IMPORTANT: 
             - Use ONLY the "resposta" key 
@@ -119,12 +98,9 @@ class PromptTemplate:
             - The text should be suitable for text-to-speech (TTS) conversion
         </response_format>
 
-        <current_session>
-            User Query: "{self.user_query}"
-            Previous Context: {json.dumps(self.context_data, indent=2) if self.context_data else "New conversation started"}
-        </current_session>
+"""
 
-        <instructions>
+    _PROMPT_INSTRUCTIONS = """        <instructions>
             Analyze the user's request and provide the answer in a conversational and natural way:
             
             1. For character counting:
@@ -144,10 +120,51 @@ class PromptTemplate:
             REMEMBER: Your response will be converted to audio, so use natural language and avoid complex formatting.
             Use only the requested JSON structure with the "resposta" key.
         </instructions>
+"""
+
+    def __init__(self, user_query, context_data=None):
+        """
+        Initializes the class with user query and context data.
+        
+        Args:
+            user_query (str): User query/question about tasks or assistance.
+            context_data (dict, optional): Additional user context data.
+        """
+        self.user_query = user_query
+        self.context_data = context_data if context_data is not None else {}
+        
+        # Create the prompt template
+        self.create_prompt_template()
+
+    def create_prompt_template(self):
+        """
+        Generates the prompt for the AI Assistant based on project requirements.
+        
+        Returns:
+            str: The formatted prompt for the assistant.
         """
+        self.prompt = f"""
+{self._PROMPT_HEAD}        <current_session>
+            User Query: "{self.user_query}"
+            Previous Context: {json.dumps(self.context_data, indent=2) if self.context_data else "New conversation started"}
+        </current_session>
+
+{self._PROMPT_INSTRUCTIONS}        """
 
         return self.prompt
     
+    @classmethod
+    def get_system_prompt(cls):
+        """
+        Returns the static system prompt, without the session block.
+        The user query is sent as the human message instead, so this prefix
+        is identical across queries and can be reused from the prompt cache.
+        
+        Returns:
+            str: The static system prompt.
+        """
+        return "\n" + cls._PROMPT_HEAD + cls._PROMPT_INSTRUCTIONS
+    
     def get_prompt_text(self):
         """
         Returns the formatted prompt text for the AI Assistant.
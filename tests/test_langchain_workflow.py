@@ -0,0 +1,213 @@
+"""
+Testes do MCPLangChainWorkflow: scheduler DAG, janela de histórico e recarga do histórico.
+Usam um modelo fake no lugar do ChatBedrock (sem chamadas à AWS).
+"""
+from typing import Any, List, Optional
+
+import pytest
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from controller.langchain_workflow import MCPLangChainWorkflow
+from services.mcp_langchain_core import MCPLangChainCore
+
+
+class EchoChatModel(BaseChatModel):
+    """Modelo fake: responde "R(<prompt>)" e registra os prompts na ordem recebida."""
+
+    prompts: List[str] = []
+
+    @property
+    def _llm_type(self) -> str:
+        return "echo"
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        prompt = messages[-1].content
+        self.prompts.append(prompt)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=f"R({prompt})"))])
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    """Substitui o cliente Bedrock pelo EchoChatModel em todos os cores criados no teste."""
+    llm = EchoChatModel()
+    monkeypatch.setattr(MCPLangChainCore, "_initialize_model", lambda self: llm)
+    monkeypatch.setenv("AWS_REGION", "us-east-1")
+    MCPLangChainCore.clear_model_cache()
+    yield llm
+    MCPLangChainCore.clear_model_cache()
+
+
+@pytest.fixture
+def make_workflow(fake_llm):
+    """Cria workflows sem carregar .env nem MCP tools."""
+    def factory(**kwargs) -> MCPLangChainWorkflow:
+        return MCPLangChainWorkflow(model_id="anthropic.fake", load_env=False,
+                                    auto_load_mcp=False, **kwargs)
+    return factory
+
+
+def conversation(turns: int) -> List[dict]:
+    """Histórico no formato de load_conversation_history com `turns` pares usuário/assistente."""
+    history = []
+    for i in range(turns):
+        history += [{"role": "user", "content": f"u{i}"}, {"role": "assistant", "content": f"a{i}"}]
+    return history
+
+
+# ===============================
+# SCHEDULER DAG
+# ===============================
+
+def test_dag_runs_steps_after_their_dependencies(make_workflow, fake_llm):
+    workflow = make_workflow()
+    steps = [
+        {"type": "simple", "input": "{step_3_result}", "depends_on": [2]},
+        {"type": "simple", "input": "b"},
+        {"type": "simple", "input": "c"},
+    ]
+
+    result = workflow.execute_workflow(steps)
+
+    assert result["success"], result.get("error")
+    assert [r["step"] for r in result["results"]] == [1, 2, 3]
+    assert result["context"]["step_1_result"] == "R(R(c))"
+    # Step 1 só roda depois dos steps 2 (depends_on) e 3 (placeholder no input)
+    assert fake_llm.prompts.index("R(c)") > fake_llm.prompts.index("b")
+    assert fake_llm.prompts.index("R(c)") > fake_llm.prompts.index("c")
+
+
+def test_dag_rejects_cycle(make_workflow, fake_llm):
+    workflow = make_workflow()
+    steps = [
+        {"type": "simple", "input": "a", "depends_on": [2]},
+        {"type": "simple", "input": "b", "depends_on": [1]},
+    ]
+
+    result = workflow.execute_workflow(steps)
+
+    assert not result["success"]
+    assert "circular" in result["error"]
+    assert fake_llm.prompts == []
+
+
+@pytest.mark.parametrize("step, number", [
+    ({"type": "simple", "input": "a", "depends_on": [1]}, 1),
+    ({"type": "simple", "input": "{step_1_result}", "depends_on": []}, 1),
+    ({"type": "simple", "input": "a", "depends_on": [3]}, 3),
+    ({"type": "simple", "input": "a", "depends_on": [0]}, 0),
+])
+def test_step_dependencies_rejects_self_and_out_of_range(step, number):
+    with pytest.raises(ValueError, match=f"step 1: {number}$"):
+        MCPLangChainWorkflow._step_dependencies(0, step, 2)
+
+
+def test_dag_reports_invalid_dependency(make_workflow, fake_llm):
+    workflow = make_workflow()
+
+    result = workflow.execute_workflow([{"type": "simple", "input": "a", "depends_on": [1]}])
+
+    assert not result["success"]
+    assert "Dependência inválida no step 1" in result["error"]
+    assert fake_llm.prompts == []
+
+
+# ===============================
+# JANELA DE HISTÓRICO
+# ===============================
+
+def test_turn_start_moves_cut_to_next_human_message():
+    messages = [
+        HumanMessage(content="u0"), AIMessage(content=""), ToolMessage(content="t", tool_call_id="x"),
+        AIMessage(content="a0"), HumanMessage(content="u1"), AIMessage(content="a1"),
+    ]
+
+    assert MCPLangChainWorkflow._turn_start(messages, 2, 0) == 4
+    assert MCPLangChainWorkflow._turn_start(messages, 4, 0) == 4
+    # Sem mensagem do usuário à frente, volta para o início do turno anterior (acima de floor)
+    assert MCPLangChainWorkflow._turn_start(messages[:4], 2, -1) == 0
+    assert MCPLangChainWorkflow._turn_start(messages[:4], 2, 0) == 2
+
+
+def test_window_without_summary_starts_at_turn(make_workflow):
+    workflow = make_workflow(history_window=3, summarize_overflow=False)
+    workflow.load_conversation_history(conversation(3))
+
+    window = workflow._windowed_history()
+
+    # len - window cai em "a1"; o corte avança para "u2" em vez de deixar a resposta órfã
+    assert [m.content for m in window] == ["u2", "a2"]
+    assert isinstance(window[0], HumanMessage)
+
+
+def test_summary_cut_starts_at_turn(make_workflow, fake_llm):
+    workflow = make_workflow(history_window=3, summarize_overflow=True)
+    workflow.load_conversation_history(conversation(4))
+
+    workflow._refresh_history_summary()
+    window = workflow._windowed_history()
+
+    assert workflow._summarized_count == 6
+    assert workflow._history_summary.startswith("R(Resuma")
+    assert "human: u2" in workflow._history_summary and "u3" not in workflow._history_summary
+    assert isinstance(window[0], HumanMessage) and window[0].content.startswith("Resumo da conversa anterior")
+    assert isinstance(window[1], AIMessage)
+    assert [m.content for m in window[2:]] == ["u3", "a3"]
+
+
+def test_summary_waits_for_twice_the_window(make_workflow, fake_llm):
+    workflow = make_workflow(history_window=3, summarize_overflow=True)
+    workflow.load_conversation_history(conversation(3))
+
+    workflow._refresh_history_summary()
+
+    assert workflow.get_history_summary() == {"summary": None, "summarized_count": 0}
+    assert fake_llm.prompts == []
+
+
+# ===============================
+# RECARGA DO HISTÓRICO
+# ===============================
+
+@pytest.fixture
+def summarized_workflow(make_workflow):
+    """Workflow com 4 turnos carregados e as 6 primeiras mensagens já resumidas."""
+    workflow = make_workflow(history_window=3, summarize_overflow=True)
+    workflow.load_conversation_history(conversation(4))
+    workflow._refresh_history_summary()
+    assert workflow._summarized_count == 6
+    return workflow
+
+
+def test_prefix_reload_keeps_summary(summarized_workflow, fake_llm):
+    state = summarized_workflow.get_history_summary()
+    calls = len(fake_llm.prompts)
+
+    assert summarized_workflow.load_conversation_history(conversation(5))
+
+    assert summarized_workflow.get_history_summary() == state
+    assert summarized_workflow.core.get_history_length() == 10
+    assert len(fake_llm.prompts) == calls
+
+
+def test_non_prefix_reload_drops_summary(summarized_workflow):
+    other = [{"role": "user", "content": "outra"}, {"role": "assistant", "content": "conversa"}]
+
+    assert summarized_workflow.load_conversation_history(other)
+
+    assert summarized_workflow.get_history_summary() == {"summary": None, "summarized_count": 0}
+    assert summarized_workflow.get_conversation_history() == other
+
+
+def test_reload_with_explicit_summary(summarized_workflow):
+    history = conversation(4)
+
+    summarized_workflow.load_conversation_history(history, summary={})
+    assert summarized_workflow.get_history_summary() == {"summary": None, "summarized_count": 0}
+
+    saved = {"summary": "resumo salvo", "summarized_count": 2}
+    summarized_workflow.load_conversation_history(history, summary=saved)
+    assert summarized_workflow.get_history_summary() == saved
+    assert [m.content for m in summarized_workflow._windowed_history()[2:4]] == ["u1", "a1"]
@@ -4,6 +4,7 @@ Tool para análise de texto - contagem de caracteres, palavras, etc.
 from langchain_core.tools import tool
 import re
 import json
+from tools.text_tools import contar_ocorrencias
 
 @tool
 def contador_caracteres(texto: str, caracter: str) -> str:
@@ -25,23 +26,14 @@ def contador_caracteres(texto: str, caracter: str) -> str:
                 "caracter_recebido": caracter
             }, ensure_ascii=False, indent=2)
         
-        # Conta occurrências (case sensitive e insensitive)
-        count_exact = texto.count(caracter)
-        count_upper = texto.count(caracter.upper()) 
-        count_lower = texto.count(caracter.lower())
-        total_case_insensitive = count_upper + count_lower
+        resultados = contar_ocorrencias(texto, caracter)
         
         resultado = {
             "tipo_resposta": "contagem_caracteres",
             "palavra_analisada": texto,
             "caracter_procurado": caracter,
-            "resultados": {
-                "exato": count_exact,
-                "maiusculo": count_upper,
-                "minusculo": count_lower,
-                "total_case_insensitive": total_case_insensitive
-            },
-            "resumo": f"O caractere '{caracter}' aparece {count_exact} vez(es) de forma exata no texto '{texto}'"
+            "resultados": resultados,
+            "resumo": f"O caractere '{caracter}' aparece {resultados['exato']} vez(es) de forma exata no texto '{texto}'"
         }
         
         return json.dumps(resultado, ensure_ascii=False, indent=2)
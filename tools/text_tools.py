@@ -8,6 +8,28 @@ from typing import Dict, Any
 from mcp_files.core.mcp_base import MCPToolBase, MCPResponseBuilder, MCPToolValidator
 
 
+def contar_ocorrencias(texto: str, caracter: str) -> Dict[str, int]:
+    """
+    Conta occurrências do caracter no texto (case sensitive e insensitive).
+    str.count já varre em C; só evita varreduras repetidas do mesmo padrão.
+    """
+    caracter_upper, caracter_lower = caracter.upper(), caracter.lower()
+    count_upper = texto.count(caracter_upper)
+    count_lower = count_upper if caracter_lower == caracter_upper else texto.count(caracter_lower)
+    if caracter == caracter_upper:
+        count_exact = count_upper
+    elif caracter == caracter_lower:
+        count_exact = count_lower
+    else:
+        count_exact = texto.count(caracter)
+    return {
+        "exato": count_exact,
+        "maiusculo": count_upper,
+        "minusculo": count_lower,
+        "total_case_insensitive": count_upper + count_lower
+    }
+
+
 class ContadorCaracteres(MCPToolBase):
     """
     Tool para contar occurrências de caracteres específicos em texto.
@@ -37,22 +59,15 @@ class ContadorCaracteres(MCPToolBase):
         Returns:
             Dict com resultados da contagem
         """
-        # Conta occurrências (case sensitive e insensitive)
-        count_exact = texto.count(caracter)
-        count_upper = texto.count(caracter.upper()) 
-        count_lower = texto.count(caracter.lower())
-        total_case_insensitive = count_upper + count_lower
+        resultados = contar_ocorrencias(texto, caracter)
         
-        return (MCPResponseBuilder("contagem_caracteres")
-                .add_input_info(palavra_analisada=texto, caracter_procurado=caracter)
-                .add_result(resultados={
-                    "exato": count_exact,
-                    "maiusculo": count_upper,
-                    "minusculo": count_lower,
-                    "total_case_insensitive": total_case_insensitive
-                })
-                .add_summary(f"O caractere '{caracter}' aparece {count_exact} vez(es) de forma exata no texto '{texto}'")
-                .build())
+        return {
+            "response_type": "contagem_caracteres",
+            "palavra_analisada": texto,
+            "caracter_procurado": caracter,
+            "resultados": resultados,
+            "summary": f"O caractere '{caracter}' aparece {resultados['exato']} vez(es) de forma exata no texto '{texto}'"
+        }
 
 
 class AnalisadorTexto(MCPToolBase):
@@ -102,27 +117,30 @@ class AnalisadorTexto(MCPToolBase):
     def _contar_palavras(self, texto: str) -> Dict[str, Any]:
         """Conta número de palavras no texto."""
         palavras = len(texto.split())
-        return (MCPResponseBuilder("contagem_palavras")
-                .add_input_info(texto_analisado=texto)
-                .add_result(total_palavras=palavras)
-                .add_summary(f"O texto '{texto}' tem {palavras} palavra(s)")
-                .build())
+        return {
+            "response_type": "contagem_palavras",
+            "texto_analisado": texto,
+            "total_palavras": palavras,
+            "summary": f"O texto '{texto}' tem {palavras} palavra(s)"
+        }
     
     def _converter_maiuscula(self, texto: str) -> Dict[str, Any]:
         """Converte texto para maiúscula."""
-        return (MCPResponseBuilder("conversao_maiuscula")
-                .add_input_info(texto_original=texto)
-                .add_result(texto_convertido=texto.upper())
-                .add_summary("Texto convertido para maiúscula")
-                .build())
+        return {
+            "response_type": "conversao_maiuscula",
+            "texto_original": texto,
+            "texto_convertido": texto.upper(),
+            "summary": "Texto convertido para maiúscula"
+        }
     
     def _converter_minuscula(self, texto: str) -> Dict[str, Any]:
         """Converte texto para minúscula."""
-        return (MCPResponseBuilder("conversao_minuscula")
-                .add_input_info(texto_original=texto)
-                .add_result(texto_convertido=texto.lower())
-                .add_summary("Texto convertido para minúscula")
-                .build())
+        return {
+            "response_type": "conversao_minuscula",
+            "texto_original": texto,
+            "texto_convertido": texto.lower(),
+            "summary": "Texto convertido para minúscula"
+        }
     
     def _contar_caracteres_total(self, texto: str) -> Dict[str, Any]:
         """Conta caracteres totais no texto."""
@@ -224,11 +242,10 @@ class ExtratorEmail(MCPToolBase):
         """
         emails = re.findall(self.email_pattern, texto)
         
-        return (MCPResponseBuilder("extracao_emails")
-                .add_input_info(texto_analisado=texto)
-                .add_result(
-                    emails_encontrados=emails,
-                    total_emails=len(emails)
-                )
-                .add_summary(f"Foram encontrados {len(emails)} email(s) no texto")
-                .build())
+        return {
+            "response_type": "extracao_emails",
+            "texto_analisado": texto,
+            "emails_encontrados": emails,
+            "total_emails": len(emails),
+            "summary": f"Foram encontrados {len(emails)} email(s) no texto"
+        }
@@ -103,8 +103,10 @@ class GeradorHash(MCPToolBase):
         else:
             raise ValueError(f"Algoritmo '{algoritmo}' não suportado")
         
-        return (MCPResponseBuilder("geracao_hash")
-                .add_input_info(texto_original=texto, algoritmo=algoritmo)
-                .add_result(hash=hash_result)
-                .add_summary(f"Hash {algoritmo.upper()} gerado com sucesso")
-                .build())
+        return {
+            "response_type": "geracao_hash",
+            "texto_original": texto,
+            "algoritmo": algoritmo,
+            "hash": hash_result,
+            "summary": f"Hash {algoritmo.upper()} gerado com sucesso"
+        }
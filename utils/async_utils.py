@@ -0,0 +1,20 @@
+"""
+Utilitários para executar coroutines a partir de código síncrono
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+
+def run_coroutine(coro):
+    """
+    Executa a coroutine até o fim a partir de código síncrono.
+    Se esta thread já tem um event loop rodando (chamador async, notebook),
+    asyncio.run falharia: a coroutine roda então em uma thread auxiliar com
+    loop próprio.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coro).result()
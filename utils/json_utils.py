@@ -0,0 +1,41 @@
+"""
+Serialização JSON compartilhada (orjson quando disponível, json da stdlib como fallback)
+"""
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # orjson é opcional: sem ele usa o json da stdlib
+    orjson = None
+
+
+def json_dumps(payload: Any, indent: bool = False) -> str:
+    """
+    Serializa para str JSON, compacto por padrão. Usa orjson quando disponível;
+    valores que ele rejeita (ex.: inteiros acima de 64 bits) passam pelo
+    encoder da stdlib.
+    """
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+        try:
+            return orjson.dumps(payload, option=option).decode()
+        except TypeError:
+            pass
+    if indent:
+        return json.dumps(payload, ensure_ascii=False, indent=2)
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+
+
+def json_loads(data: Any) -> Any:
+    """
+    Faz o parse de str ou bytes JSON. orjson é estrito (não aceita caracteres de
+    controle crus dentro de strings), então nesses casos cai no
+    json.loads(strict=False). JSON inválido levanta json.JSONDecodeError (ValueError).
+    """
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(data, strict=False)
@@ -2,8 +2,13 @@
 Utilitários para processamento de resposta do Bedrock
 """
 import json
+import logging
 from typing import Union, Dict, Any
 
+from utils.json_utils import json_loads
+
+logger = logging.getLogger(__name__)
+
 
 class ResponseProcessor:
     """
@@ -34,11 +39,11 @@ class ResponseProcessor:
             # Processa JSON se presente
             response_json = ResponseProcessor._extract_json(response_str)
             
-            print('[DEBUG] Resposta processada com sucesso')
+            logger.debug('Resposta processada com sucesso')
             return response_json
         
         except Exception as e:
-            print(f'[DEBUG] Erro no processamento da resposta: {e}')
+            logger.debug('Erro no processamento da resposta: %s', e)
             return {
                 "message": str(response), 
                 "type": "agent_response",
@@ -145,11 +150,11 @@ class ResponseProcessor:
                 json_part = ResponseProcessor._clean_json_string(json_part)
                 
                 try:
-                    response_json = json.loads(json_part, strict=False)
+                    response_json = json_loads(json_part)
                     return response_json
                 except json.JSONDecodeError as je:
-                    print(f'[DEBUG] Erro JSON: {je}')
-                    print(f'[DEBUG] JSON problemático: {json_part[:200]}...')
+                    logger.debug('Erro JSON: %s', je)
+                    logger.debug('JSON problemático: %.200s...', json_part)
                     return {
                         "message": response_str, 
                         "type": "agent_response",